@@ -0,0 +1,95 @@
+#
+# CHECKPOINT
+#
+# Files written as a run goes, to resume it after an interruption: task sets and append-only records of the results
+#
+# LIAS (ISAE-ENSMA)
+
+
+# -----------------------------------------------------------
+# Import
+
+from ast import literal_eval
+from pathlib import Path
+import csv
+import json
+
+from basicFunctions.taskSet import TaskSet
+from basicFunctions.results import ResultStore
+
+
+# -----------------------------------------------------------
+# Files written line by line
+
+def readCompleteLines(fileName):
+    # Lines of a file written line by line (none if it does not exist). An incomplete last line, left by an
+    # interruption, is dropped and cut from the file, so that new lines can be appended after the complete ones.
+    try:
+        with open(fileName, 'rb') as file: data = file.read()
+    except FileNotFoundError:
+        return []
+
+    end = data.rfind(b'\n') + 1
+    if end < len(data):
+        with open(fileName, 'r+b') as file: file.truncate(end)
+    return data[:end].decode().splitlines()
+
+
+def parseTaskSets(lines):
+    # Task sets of the lines of a task sets CSV file: a '(T1,c1);(T2,c2);...' header, then one set per line
+    list_taskSets = []
+    for row in csv.reader(lines[1:], delimiter=';'):
+        tasks = [literal_eval(cell) for cell in row]
+        list_taskSets.append( TaskSet([period for period, execTime in tasks], [execTime for period, execTime in tasks]) )
+    return list_taskSets
+
+
+def readTaskSets(fileName):
+    # Task sets of a task sets CSV file written line by line
+    return parseTaskSets(readCompleteLines(fileName))
+
+
+def loadRun(folder):
+    # Task sets of the run saved in folder, with its results (ResultStore) if it has a results_*.npz file, from the
+    # taskSets_*.csv file otherwise (results None). The files of the folder are only read.
+    for fileName in sorted(Path(folder).glob('results_*.npz')):
+        results = ResultStore.load(fileName)
+        return [ TaskSet(periods, execTimes) for periods, execTimes in zip(results.periods.tolist(), results.execTimes.tolist()) ], results
+
+    for fileName in sorted(Path(folder).glob('taskSets_*.csv')):
+        with open(fileName) as file: data = file.read()
+        return parseTaskSets(data[:data.rfind('\n') + 1].splitlines()), None
+
+    raise FileNotFoundError('No results_*.npz or taskSets_*.csv file in ' + str(folder))
+
+
+# -----------------------------------------------------------
+# Records
+
+class RecordLog:
+    # Append-only JSON lines file of the results of a run, with one record per step of an (algorithm, set) pair:
+    # {'algorithm', 'set', 'calcTime', 'offsets'} once its offsets are calculated, {'algorithm', 'set', 'maxDelays'}
+    # once they are simulated. Each record is flushed when written, so only the current steps are lost on an interruption.
+    # The records found when opening the file are merged by pair and can be taken with pop; written records are not kept.
+
+    def __init__(self, fileName):
+        self.fileName = fileName
+        self.records = {}
+        for line in readCompleteLines(fileName):
+            record = json.loads(line)
+            self.records.setdefault( (record['algorithm'], record['set']), {} ).update(record)
+        self.file = open(fileName, 'a')
+
+
+    def pop(self, algorithm, i):
+        # Merged record of a pair found in the file ({} if none)
+        return self.records.pop( (algorithm, i), {} )
+
+
+    def write(self, algorithm, i, **fields):
+        self.file.write( json.dumps({'algorithm': algorithm, 'set': i, **fields}) + '\n' )
+        self.file.flush()
+
+
+    def close(self):
+        self.file.close()
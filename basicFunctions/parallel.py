@@ -0,0 +1,154 @@
+#
+# PARALLEL EXECUTION
+#
+# Process pool for the offset calculation and simulation stages of the analysis
+#
+# LIAS (ISAE-ENSMA)
+
+
+# -----------------------------------------------------------
+# Import
+
+from multiprocessing import get_context, get_all_start_methods
+from time import time as now
+from math import ceil
+import random
+import numpy as np
+
+from basicFunctions.taskSet import TaskSet, taskPeriods, taskExecTimes
+from basicFunctions.simulation import getMaxDelays
+from basicFunctions.simulationCache import simulationKey
+
+
+# -----------------------------------------------------------
+# Pool
+
+def initWorker():
+    # Forked workers inherit the state of the random module: draw a new seed for each worker
+    random.seed()
+
+
+def createPool(numberWorkers):
+    # Process pool of numberWorkers processes, or None to run serially (numberWorkers <= 1). Uses fork where available,
+    # so the workers start without re-importing the analysis script.
+    if numberWorkers == None or numberWorkers <= 1: return None
+    context = get_context('fork' if 'fork' in get_all_start_methods() else None)
+    return context.Pool(numberWorkers, initWorker)
+
+
+# -----------------------------------------------------------
+# Offset calculation
+
+def runOffsetJob(job):
+    # job = (function, taskSet, keyword arguments). The calculation time is measured in the process running it.
+    function, taskSet, kwargs = job
+    start = now()
+    offsets = function(taskSet, **kwargs)
+    end = now()
+    return (end - start, offsets)
+
+
+def runOffsetJobs(jobs, pool = None):
+    # Iterator over the (calcTime, offsets) of every job, in the order of jobs, each given as soon as it is done
+    if pool == None: return map(runOffsetJob, jobs)
+    return pool.imap(runOffsetJob, jobs, chunksize = 1)
+
+
+def runBatchOffsetJob(job):
+    # job = (batch function, task sets). The batch function returns the offsets array and the calculation time of each set.
+    function, list_taskSets = job
+    offsets, calcTimes = function(list_taskSets)
+    return calcTimes.tolist(), offsets.tolist()
+
+
+def runBatchOffsetJobs(function, list_taskSets, pool = None, chunkSize = 1000, numberWorkers = 1):
+    # Iterator over the (calcTime, offsets) of every task set, in order, calculated by chunks of chunkSize sets with
+    # a batch function (such as heuristicSchedulingBatch). With a pool of numberWorkers processes, the chunks are made
+    # smaller if needed so that every worker gets one.
+    if pool != None: chunkSize = max(1, min(chunkSize, ceil(len(list_taskSets) / numberWorkers)))
+    jobs = [ (function, list_taskSets[start:start + chunkSize]) for start in range(0, len(list_taskSets), chunkSize) ]
+    outputs = map(runBatchOffsetJob, jobs) if pool == None else pool.imap(runBatchOffsetJob, jobs)
+    for calcTimes, offsets in outputs:
+        yield from zip(calcTimes, offsets)
+
+
+# -----------------------------------------------------------
+# Simulation
+
+def simulateChunk(chunk):
+    # chunk = (periods, execTimes, offsets, engine, steadyState), with m x n integer arrays: one row per task set and
+    # offset assignment to simulate. Returns the m x n maximum delays, the schedulability of each row and the number
+    # of simulated jobs of each row.
+    periods, execTimes, offsets, engine, steadyState = chunk
+    m = len(offsets)
+    maxDelays = np.zeros(offsets.shape, dtype=np.int64)
+    events = np.zeros(m, dtype=np.int64)
+
+    for r in range(m):
+        taskSet = TaskSet(periods[r].tolist(), execTimes[r].tolist())
+        stats = {}
+        maxDelays[r] = getMaxDelays(taskSet, offsets[r].tolist(), engine = engine, steadyState = steadyState, stats = stats)
+        events[r] = stats.get('events', 0)
+
+    schedulable = (maxDelays + execTimes <= periods).all(axis = 1)
+    return maxDelays, schedulable, events
+
+
+def simulatePairs(list_taskSets, list_offsets, engine = 'heap', steadyState = False, pool = None, chunkSize = 64, cache = None):
+    # Maximum delays of each (task set, offsets) pair, simulated by chunks of chunkSize pairs in the processes of pool.
+    # Pairs found in cache (a SimulationCache) are not simulated, and new results are added to it.
+    # Returns the lists of maximum delays (tuples), schedulability flags and simulated jobs of each pair.
+    nPairs = len(list_taskSets)
+    list_maxDelays = [None] * nPairs
+    list_schedulable = [None] * nPairs
+    list_events = [0] * nPairs
+
+    # Pairs to simulate, without duplicates
+    keys = [None] * nPairs
+    toSimulate = []
+    firstPair = {}
+    for p in range(nPairs):
+        if cache != None:
+            keys[p] = simulationKey(list_taskSets[p], list_offsets[p])
+            if keys[p] in firstPair:
+                cache.stats['hits'] += 1
+                continue
+            maxDelays = cache.get(keys[p])
+            if maxDelays != None:
+                list_maxDelays[p] = tuple(maxDelays)
+                continue
+            firstPair[keys[p]] = p
+        toSimulate.append(p)
+
+    # Chunks of pairs with the same number of tasks, as compact integer arrays
+    chunks = []
+    chunkPairs = []
+    start = 0
+    while start < len(toSimulate):
+        n = len(list_taskSets[toSimulate[start]])
+        end = start + 1
+        while end < len(toSimulate) and end - start < chunkSize and len(list_taskSets[toSimulate[end]]) == n: end += 1
+        pairs = toSimulate[start:end]
+        chunks.append( (np.array([taskPeriods(list_taskSets[p]) for p in pairs], dtype=np.int64),
+                        np.array([taskExecTimes(list_taskSets[p]) for p in pairs], dtype=np.int64),
+                        np.array([list_offsets[p] for p in pairs], dtype=np.int64),
+                        engine, steadyState) )
+        chunkPairs.append(pairs)
+        start = end
+
+    outputs = map(simulateChunk, chunks) if pool == None else pool.imap(simulateChunk, chunks)
+    for pairs, (maxDelays, schedulable, events) in zip(chunkPairs, outputs):
+        for row, p in enumerate(pairs):
+            list_maxDelays[p] = tuple(maxDelays[row].tolist())
+            list_schedulable[p] = bool(schedulable[row])
+            list_events[p] = int(events[row])
+            if cache != None: cache.put(keys[p], list_maxDelays[p])
+
+    # Cached and duplicate pairs
+    for p in range(nPairs):
+        if list_schedulable[p] != None: continue
+        if list_maxDelays[p] == None: list_maxDelays[p] = list_maxDelays[firstPair[keys[p]]]
+        periods, execTimes = taskPeriods(list_taskSets[p]), taskExecTimes(list_taskSets[p])
+        list_schedulable[p] = all([list_maxDelays[p][j] + execTimes[j] <= periods[j] for j in range(len(periods))])
+
+    return list_maxDelays, list_schedulable, list_events
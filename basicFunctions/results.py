@@ -0,0 +1,85 @@
+#
+# RESULT STORE
+#
+# Results of the offset assignment algorithms over a list of task sets, stored by column in NumPy arrays
+#
+# LIAS (ISAE-ENSMA)
+
+
+# -----------------------------------------------------------
+# Import
+
+import numpy as np
+
+from basicFunctions.taskSet import taskPeriods, taskExecTimes
+
+
+# -----------------------------------------------------------
+# Result store
+
+class ResultStore:
+    # For nAlgorithms algorithms (names) and nSets task sets of nTasks tasks:
+    # - periods, execTimes: nSets x nTasks integer arrays of the task sets
+    # - offsets, maxDelays: nAlgorithms x nSets x nTasks integer arrays
+    # - calcTimes: nAlgorithms x nSets float array
+    # - simStats: one dict of simulation statistics per algorithm
+    # - hasOffsets, hasMaxDelays: nAlgorithms x nSets booleans, True once the offsets / maximum delays are filled in
+
+    def __init__(self, names, list_taskSets):
+        self.names = tuple(names)
+        self.periods = np.array([taskPeriods(taskSet) for taskSet in list_taskSets], dtype=np.int64)
+        self.execTimes = np.array([taskExecTimes(taskSet) for taskSet in list_taskSets], dtype=np.int64)
+
+        shape = (len(self.names),) + self.periods.shape
+        self.offsets = np.zeros(shape, dtype=np.int64)
+        self.maxDelays = np.zeros(shape, dtype=np.int64)
+        self.calcTimes = np.zeros(shape[:2])
+        self.simStats = tuple([{} for _ in self.names])
+        self.hasOffsets = np.zeros(shape[:2], dtype=bool)
+        self.hasMaxDelays = np.zeros(shape[:2], dtype=bool)
+
+    def save(self, fileName):
+        # Compressed NumPy archive (.npz) of the arrays and the names of the algorithms (not the simulation statistics)
+        np.savez_compressed(fileName, names=np.array(self.names), periods=self.periods, execTimes=self.execTimes, offsets=self.offsets,
+                            maxDelays=self.maxDelays, calcTimes=self.calcTimes, hasOffsets=self.hasOffsets, hasMaxDelays=self.hasMaxDelays)
+
+    @classmethod
+    def load(cls, fileName):
+        # Result store saved by save
+        results = cls.__new__(cls)
+        with np.load(fileName) as data:
+            results.names = tuple(data['names'].tolist())
+            for key in ('periods', 'execTimes', 'offsets', 'maxDelays', 'calcTimes', 'hasOffsets', 'hasMaxDelays'):
+                setattr(results, key, data[key])
+        results.simStats = tuple([{} for _ in results.names])
+        return results
+
+    @property
+    def nSets(self):
+        return self.periods.shape[0]
+
+    def schedulable(self):
+        # nAlgorithms x nSets booleans: every task of the set ends before its next call
+        return (self.maxDelays + self.execTimes <= self.periods).all(axis=2)
+
+    def notSchedulable(self):
+        # Number of non schedulable sets of each algorithm
+        return (~self.schedulable()).sum(axis=1)
+
+    def totalCalcTimes(self):
+        return self.calcTimes.sum(axis=1)
+
+    def delayMetrics(self):
+        # Maximum delays of every task, for each algorithm (nAlgorithms x (nSets * nTasks) arrays): absolute, per period,
+        # per largest execution time among the other tasks of the set, and maximum response time per execution time
+        largest = np.sort(self.execTimes, axis=1)[:, ::-1]
+        if largest.shape[1] > 1:
+            otherMaxExecTimes = np.where(self.execTimes == largest[:, :1], largest[:, 1:2], largest[:, :1])
+        else:
+            otherMaxExecTimes = np.zeros_like(self.execTimes)
+
+        nAlgorithms = len(self.names)
+        return ( self.maxDelays.reshape(nAlgorithms, -1),
+                 (self.maxDelays / self.periods).reshape(nAlgorithms, -1),
+                 (self.maxDelays / otherMaxExecTimes).reshape(nAlgorithms, -1),
+                 ((self.maxDelays + self.execTimes) / self.execTimes).reshape(nAlgorithms, -1) )
@@ -9,10 +9,17 @@
 
 # -----------------------------------------------------------
 # Import
-from math import lcm, gcd
+from math import lcm, gcd, comb
 from functools import reduce
+from heapq import heapify, heapreplace
+from bisect import bisect_left, bisect_right, insort
+from itertools import islice, combinations_with_replacement
+from multiprocessing import get_context, get_all_start_methods, cpu_count
+import numpy as np
 from time import time as now
 from datetime import datetime, timedelta
+from basicFunctions.toImport import calcNonEquivOffsets
+from basicFunctions.taskSet import taskPeriods, taskExecTimes
 
 # -----------------------------------------------------------
 # Definitions
@@ -42,23 +49,28 @@ def printProgressBar (iteration, total, prefix = '', suffix = '', decimals = 1,
 # -----------------------------------------------------------
 # Simulate to get maximum delays
 
-def getMaxDelaysFromSim(taskSet, offsets):
+def getMaxDelaysFromSim(taskSet, offsets, steadyState = False, stats = None):
 
     n = len(taskSet)
-    hyperperiod = reduce(lcm, [task['period'] for task in taskSet])
-    maxTime = 2 * hyperperiod + max(offsets)
+    list_periods = list(taskPeriods(taskSet))
+    list_execTimes = list(taskExecTimes(taskSet))
+    hyperperiod = reduce(lcm, list_periods)
+    maxOffset = max(offsets)
+    maxTime = 2 * hyperperiod + maxOffset
+    steadyTime = maxOffset + hyperperiod
 
     maxDelays = [0] * n
 
     calls = list(offsets)
+    events = 0
 
     # Start at the first call
     t = min(calls)
     while t < maxTime :
+        events += 1
         # FIFO: check next task to be executed
         earliestCall = min(calls)
         i = calls.index(earliestCall)
-        executingTask = taskSet[i]
         # Chech if there is any delay. If so, register.
         if earliestCall < t :
             delayTime = t - earliestCall
@@ -66,16 +78,388 @@ def getMaxDelaysFromSim(taskSet, offsets):
         # Else: forward to earliest call
         else:
             t = earliestCall
+            # see getMaxDelaysFromSimHeap
+            if steadyState and earliestCall >= steadyTime: break
 
         # Execute task
-        t += executingTask['execTime']
+        t += list_execTimes[i]
 
         # Update calls
-        calls[i] += executingTask['period']
+        calls[i] += list_periods[i]
+
+    if stats is not None: stats['events'] = stats.get('events', 0) + events
 
     return tuple(maxDelays)
 
 
+# -----------------------------------------------------------
+# Simulate to get maximum delays -- event queue
+
+def getMaxDelaysFromSimHeap(taskSet, offsets, steadyState = False, stats = None):
+    # Same FIFO simulation as getMaxDelaysFromSim, but pending calls are kept in a binary heap of (call, i).
+    # Ties on the call instant are broken by the lowest task index, as calls.index() does.
+    # With steadyState, the simulation stops at the first job that starts on an idle link at least one hyperperiod after
+    # every task has been called. The backlog at t + hyperperiod is never smaller than at t, so the backlog was also empty
+    # one hyperperiod before: the schedule is periodic from there on and no new maximum delay can appear.
+
+    n = len(taskSet)
+    list_periods = list(taskPeriods(taskSet))
+    list_execTimes = list(taskExecTimes(taskSet))
+    hyperperiod = reduce(lcm, list_periods)
+    maxOffset = max(offsets)
+    maxTime = 2 * hyperperiod + maxOffset
+    steadyTime = maxOffset + hyperperiod
+
+    maxDelays = [0] * n
+
+    calls = [(offsets[i], i) for i in range(n)]
+    heapify(calls)
+    events = 0
+
+    # Start at the first call
+    t = calls[0][0]
+    while t < maxTime :
+        events += 1
+        earliestCall, i = calls[0]
+        if earliestCall < t :
+            delayTime = t - earliestCall
+            if delayTime > maxDelays[i]: maxDelays[i] = delayTime
+        else:
+            t = earliestCall
+            if steadyState and earliestCall >= steadyTime: break
+
+        t += list_execTimes[i]
+
+        # Replace the executed call by the next call of the same task
+        heapreplace(calls, (earliestCall + list_periods[i], i))
+
+    if stats is not None: stats['events'] = stats.get('events', 0) + events
+
+    return tuple(maxDelays)
+
+
+# Simulation engines that can be selected by the analysis scripts
+simulationEngines = {'linear': getMaxDelaysFromSim, 'heap': getMaxDelaysFromSimHeap}
+
+def getMaxDelays(taskSet, offsets, engine = 'heap', steadyState = False, stats = None):
+    if engine not in simulationEngines:
+        raise ValueError(f'Unknown simulation engine "{engine}". Options are: {", ".join(simulationEngines)}')
+    return simulationEngines[engine](taskSet, offsets, steadyState = steadyState, stats = stats)
+
+
+# -----------------------------------------------------------
+# Simulate many offset assignments of the same task set at once
+
+def simulateBatch(taskSet, offsetsMatrix, steadyState = False, previousMax = None, stats = None):
+    # Run the FIFO simulation of getMaxDelaysFromSim for K offset assignments (K x n matrix) of the same task set.
+    # All K schedules advance together, one job per schedule and per step, with array operations.
+    # Each step costs a few NumPy calls whatever K, so it is slower than getMaxDelaysFromSimHeap on each row below a few
+    # hundred rows: it is meant for the chunks of evalBestSetup (batchSize).
+    # np.argmin returns the first minimum, which gives the same lowest index tie-break as calls.index().
+    # With previousMax, a schedule stops as soon as a normalized delay exceeds it (its row is then flagged as pruned).
+    # Returns the K x n matrix of maximum delays and the vector of pruned rows.
+
+    list_periods = list(taskPeriods(taskSet))
+    periods = np.array(list_periods, dtype=np.int64)
+    execTimes = np.array(taskExecTimes(taskSet), dtype=np.int64)
+    hyperperiod = reduce(lcm, list_periods)
+
+    calls = np.array(offsetsMatrix, dtype=np.int64).reshape(-1, len(taskSet))
+    K = calls.shape[0]
+    maxOffsets = calls.max(axis=1)
+    maxTimes = 2 * hyperperiod + maxOffsets
+    steadyTimes = maxOffsets + hyperperiod
+
+    maxDelays = np.zeros(calls.shape, dtype=np.int64)
+    pruned = np.zeros(K, dtype=bool)
+
+    t = calls.min(axis=1)
+    rows = np.flatnonzero(t < maxTimes)
+    events = 0
+
+    while len(rows) > 0:
+        events += len(rows)
+        rowCalls = calls[rows]
+        i = rowCalls.argmin(axis=1)
+        earliestCalls = rowCalls[np.arange(len(rows)), i]
+        t_rows = t[rows]
+
+        delayed = earliestCalls < t_rows
+        delayTimes = np.where(delayed, t_rows - earliestCalls, 0)
+        maxDelays[rows, i] = np.maximum(maxDelays[rows, i], delayTimes)
+
+        # Rows that can stop before executing this job
+        stop = np.zeros(len(rows), dtype=bool)
+        if steadyState: stop |= (~delayed) & (earliestCalls >= steadyTimes[rows])    # see getMaxDelaysFromSimHeap
+        if previousMax != None:
+            exceeded = delayTimes / periods[i] > previousMax
+            pruned[rows[exceeded]] = True
+            stop |= exceeded
+
+        t_rows = np.where(delayed, t_rows, earliestCalls) + execTimes[i]
+        t[rows] = t_rows
+        calls[rows, i] = earliestCalls + periods[i]
+
+        rows = rows[(~stop) & (t_rows < maxTimes[rows])]
+
+    if stats is not None: stats['events'] = stats.get('events', 0) + events
+
+    return maxDelays, pruned
+
+
+def getMaxDelaysFromSimBatch(taskSet, offsetsMatrix, steadyState = False, stats = None):
+    # K x n matrix of maximum delays, one line per offset assignment (same values as getMaxDelaysFromSim)
+    maxDelays, _ = simulateBatch(taskSet, offsetsMatrix, steadyState = steadyState, stats = stats)
+    return maxDelays
+
+# -----------------------------------------------------------
+# Incremental simulation, for offset changes of a single task
+
+class IncrementalSimulation:
+    # Maximum delays of a task set, updated when the offset of one task changes.
+    #
+    # When U < 1, the delays returned by getMaxDelaysFromSim are the ones of the steady-state schedule, which repeats
+    # every hyperperiod H. The calls of task i are not stored: they are offsets[i] + k * periods[i] modulo H. Jobs are
+    # dispatched in the order of their (call, i), so the schedule of [0, H) is cut into segments of about segmentSize
+    # consecutive jobs, each kept with its end, the backlog of the link at its start and at its end (time left before the
+    # link is free), the largest delay of every task delayed in it and its smallest delay.
+    #
+    # move() removes the segments containing an old or a new call of the moved task, and simulates again from their
+    # starts (the pending instants), merging the calls of the tasks in a heap, until it reaches the start of an
+    # unchanged segment with the same backlog. A segment reached with its backlog changed by delta, in which every job
+    # stays delayed, is not simulated again: its delays are all changed by delta.
+    # A move costs about segmentSize jobs per segment it touches, plus the jobs up to where the change is absorbed: a
+    # task with about as many calls in H as there are segments touches all of them, and its moves cost about as much as
+    # getMaxDelaysFromSimHeap.
+    #
+    # When U >= 1 there may be no idle instant, and every move runs a full simulation.
+
+    # Mean number of jobs in a segment
+    segmentSize = 128
+
+    def __init__(self, taskSet, offsets):
+        self.taskSet = taskSet
+        self.periods = list(taskPeriods(taskSet))
+        self.execTimes = list(taskExecTimes(taskSet))
+        self.hyperperiod = reduce(lcm, self.periods)
+
+        n = len(self.periods)
+        self.jobsPerHyperperiod = sum([self.hyperperiod // self.periods[i] for i in range(n)])
+        # Segments are cut at the first call after this length
+        self.segmentLength = min(self.hyperperiod, max(1, self.hyperperiod * self.segmentSize // self.jobsPerHyperperiod))
+        workload = sum([self.execTimes[i] * (self.hyperperiod // self.periods[i]) for i in range(n)])
+        self.steadyState = workload < self.hyperperiod
+
+        self.reset(offsets)
+
+
+    def reset(self, offsets):
+        # Simulate the whole schedule for new offsets
+        n = len(self.periods)
+        self.offsets = list(offsets)
+
+        if not self.steadyState:
+            self.maxDelays = list(getMaxDelaysFromSimHeap(self.taskSet, self.offsets, steadyState = True))
+            return tuple(self.maxDelays)
+
+        self.segmentStarts = []
+        self.segments = {}
+        self.delayCounts = [{} for _ in range(n)]
+        self.maxDelays = [0] * n
+        self.changedTasks = set()
+        # Instants to simulate from, with the backlog of the link at each one
+        self.pending = {self.findIdleInstant(): 0}
+        self.simulate()
+        return self.update()
+
+
+    def findIdleInstant(self):
+        # Instant of [0, H) at which a job starts on an idle link in the steady state (stop condition of
+        # getMaxDelaysFromSimHeap)
+        n = len(self.periods)
+        calls = [(self.offsets[i], i) for i in range(n)]
+        heapify(calls)
+        steadyTime = max(self.offsets) + self.hyperperiod
+
+        t = calls[0][0]
+        while True:
+            call, i = calls[0]
+            if call >= t:
+                if call >= steadyTime: return call % self.hyperperiod
+                t = call
+            t += self.execTimes[i]
+            heapreplace(calls, (call + self.periods[i], i))
+
+
+    def callsFrom(self, time):
+        # Heap of the next call of every task at or after the instant time
+        calls = [ (time + (self.offsets[i] - time) % self.periods[i], i) for i in range(len(self.periods)) ]
+        heapify(calls)
+        return calls
+
+
+    def segmentOf(self, time):
+        # Start of the segment covering the instant time of [0, H), or None if it is to be simulated again
+        if self.segmentStarts == []: return None
+        k = bisect_right(self.segmentStarts, time) - 1
+        # Only the last segment can go past H, and cover the instants before the first start
+        start = self.segmentStarts[k]
+        if time + (self.hyperperiod if k < 0 else 0) < self.segments[start][0]: return start
+        return None
+
+
+    def nextSegmentStart(self, time):
+        # First start of a segment after the instant time (not reduced modulo H), or time + H if there is none
+        if self.segmentStarts == []: return time + self.hyperperiod
+        lap = time - time % self.hyperperiod
+        k = bisect_right(self.segmentStarts, time % self.hyperperiod)
+        if k == len(self.segmentStarts): return lap + self.hyperperiod + self.segmentStarts[0]
+        return lap + self.segmentStarts[k]
+
+
+    def addSegment(self, start, segment):
+        # segment = (end, backlog, end backlog, {task: largest delay}, smallest delay)
+        self.segments[start] = segment
+        insort(self.segmentStarts, start)
+        for i, delayTime in segment[3].items():
+            counts = self.delayCounts[i]
+            counts[delayTime] = counts.get(delayTime, 0) + 1
+        self.changedTasks.update(segment[3])
+
+
+    def removeSegment(self, start):
+        segment = self.segments.pop(start)
+        del self.segmentStarts[bisect_left(self.segmentStarts, start)]
+        for i, delayTime in segment[3].items():
+            counts = self.delayCounts[i]
+            counts[delayTime] -= 1
+            if counts[delayTime] == 0: del counts[delayTime]
+        self.changedTasks.update(segment[3])
+        return segment
+
+
+    def updateMaxDelay(self, i):
+        self.maxDelays[i] = max(self.delayCounts[i]) if self.delayCounts[i] else 0
+
+
+    def simulate(self):
+        # Simulate from the pending instants until the start of an existing segment is reached with its backlog.
+        # Existing segments reached with another backlog are shifted or simulated again.
+        H = self.hyperperiod
+        periods = self.periods
+        execTimes = self.execTimes
+        segmentLength = self.segmentLength
+        n = len(periods)
+        inf = float('inf')
+        # Simulated time after which the schedule should have converged
+        timeBudget = 3 * H
+
+        for instant in sorted(self.pending):
+            if self.segmentOf(instant) != None: continue
+
+            calls = self.callsFrom(instant)
+            start = instant
+            backlog = self.pending[instant]
+            t = instant + backlog
+            maxima = [0] * n
+            minDelay = inf
+            nextStart = self.nextSegmentStart(instant)
+            nextCut = start + segmentLength
+            limit = min(nextStart, nextCut)
+
+            while True:
+                call, i = calls[0]
+                if call >= limit:
+                    end = nextStart if call >= nextStart else call
+                    endBacklog = t - end if t > end else 0
+                    self.addSegment(start % H, (start % H + end - start, backlog, endBacklog,
+                                                { j: maxima[j] for j in range(n) if maxima[j] }, 0 if minDelay == inf else minDelay))
+                    timeBudget -= end - start
+                    if timeBudget < 0: raise RuntimeError('Incremental simulation did not converge')
+                    start = end
+                    backlog = endBacklog
+                    maxima = [0] * n
+                    minDelay = inf
+
+                    if end == nextStart:
+                        # Start of an existing segment: unchanged from there if the link has the same backlog
+                        segment = self.segments[start % H]
+                        if backlog == segment[1]: break
+
+                        # Segments in which every job stays delayed: all their delays change by delta
+                        delta = backlog - segment[1]
+                        shifted = False
+                        while segment != None and segment[4] > 0 and segment[4] + delta > 0:
+                            end, segmentBacklog, segmentEndBacklog, segmentMaxima, segmentMinDelay = self.removeSegment(start % H)
+                            self.addSegment(start % H, (end, segmentBacklog + delta, segmentEndBacklog + delta,
+                                                        { j: delayTime + delta for j, delayTime in segmentMaxima.items() }, segmentMinDelay + delta))
+                            timeBudget -= end - start % H
+                            if timeBudget < 0: raise RuntimeError('Incremental simulation did not converge')
+                            start += end - start % H
+                            backlog = segmentEndBacklog + delta
+                            segment = self.segments.get(start % H)
+                            shifted = True
+
+                        # Simulate again from there
+                        if segment != None: self.removeSegment(start % H)
+                        if shifted: calls = self.callsFrom(start)
+                        t = start + backlog
+                        nextStart = self.nextSegmentStart(start)
+                    nextCut = start + segmentLength
+                    limit = min(nextStart, nextCut)
+                    continue
+
+                if call < t:
+                    delayTime = t - call
+                    if delayTime < minDelay: minDelay = delayTime
+                    if delayTime > maxima[i]: maxima[i] = delayTime
+                    t += execTimes[i]
+                else:
+                    minDelay = 0
+                    t = call + execTimes[i]
+                heapreplace(calls, (call + periods[i], i))
+
+        self.pending = {}
+
+
+    def update(self):
+        # Simulate the pending instants and return the maximum delays
+        try:
+            self.simulate()
+        except RuntimeError:
+            return self.reset(self.offsets)
+
+        for i in self.changedTasks: self.updateMaxDelay(i)
+        self.changedTasks = set()
+        return tuple(self.maxDelays)
+
+
+    def move(self, task, newOffset):
+        # Change the offset of one task, and return the new maximum delays
+        oldOffset = self.offsets[task]
+        self.offsets[task] = newOffset
+
+        if not self.steadyState: return self.reset(self.offsets)
+        period = self.periods[task]
+
+        # Segments covering the old and new calls of the task
+        if (newOffset - oldOffset) % period != 0:
+            if self.hyperperiod // period < len(self.segmentStarts):
+                starts = set()
+                for offset in (oldOffset, newOffset):
+                    for call in range(offset % period, self.hyperperiod, period):
+                        starts.add(self.segmentOf(call))
+                starts.discard(None)
+            else:
+                # More calls than segments: test each segment for a call instead
+                starts = [ start for start in self.segmentStarts
+                           if (oldOffset - start) % period < self.segments[start][0] - start
+                           or (newOffset - start) % period < self.segments[start][0] - start ]
+            for start in starts: self.pending[start] = self.removeSegment(start)[1]
+
+        return self.update()
+
+
 # # -----------------------------------------------------------
 # # Simulation
 
@@ -158,36 +542,86 @@ def f_printResults(n, sumDelays, maxDelays, maxTime, periods):
 # -----------------------------------------------------------
 # Simulation specific for eval best setup
 
-def evalOffsetAssignment(taskSet, offsets, previousMax = None):
+def evalOffsetAssignment(taskSet, offsets, previousMax = None, steadyState = False):
 
     n = len(taskSet)
-    list_periods = [task['period'] for task in taskSet]
+    list_periods = list(taskPeriods(taskSet))
+    list_execTimes = list(taskExecTimes(taskSet))
 
     maxDelays = [0] * n
     hyperperiod = reduce(lcm, list_periods)
-    maxTime = 2*hyperperiod + max(offsets)
+    maxOffset = max(offsets)
+    maxTime = 2*hyperperiod + maxOffset
+    steadyTime = maxOffset + hyperperiod
 
     calls = list(offsets)
     t = min(calls)
     while t < maxTime :
         earliestCall = min(calls)
         i = calls.index(earliestCall)
-        currentTask = taskSet[i]
         
         if earliestCall < t :
             delayTime = t - earliestCall
-            delayTime_T = delayTime / currentTask['period']
+            delayTime_T = delayTime / list_periods[i]
             if (previousMax != None) and (delayTime_T > previousMax): return None
             maxDelays[i] = max(maxDelays[i], delayTime_T)
         else:
             t = earliestCall
+            # see getMaxDelaysFromSimHeap
+            if steadyState and earliestCall >= steadyTime: break
+
+        t += list_execTimes[i]
+        calls[i] += list_periods[i]
+
+    return max(maxDelays)
+
+
+def evalOffsetAssignmentHeap(taskSet, offsets, previousMax = None, steadyState = False):
+    # Same as evalOffsetAssignment, with pending calls in a binary heap (see getMaxDelaysFromSimHeap)
+
+    n = len(taskSet)
+    list_periods = list(taskPeriods(taskSet))
+    list_execTimes = list(taskExecTimes(taskSet))
+
+    maxDelays = [0] * n
+    hyperperiod = reduce(lcm, list_periods)
+    maxOffset = max(offsets)
+    maxTime = 2*hyperperiod + maxOffset
+    steadyTime = maxOffset + hyperperiod
+
+    calls = [(offsets[i], i) for i in range(n)]
+    heapify(calls)
+
+    t = calls[0][0]
+    while t < maxTime :
+        earliestCall, i = calls[0]
+
+        if earliestCall < t :
+            delayTime_T = (t - earliestCall) / list_periods[i]
+            if (previousMax != None) and (delayTime_T > previousMax): return None
+            if delayTime_T > maxDelays[i]: maxDelays[i] = delayTime_T
+        else:
+            t = earliestCall
+            # see getMaxDelaysFromSimHeap
+            if steadyState and earliestCall >= steadyTime: break
 
-        t += currentTask['execTime']
-        calls[i] += currentTask['period']
+        t += list_execTimes[i]
+        heapreplace(calls, (earliestCall + list_periods[i], i))
 
     return max(maxDelays)
 
 
+evalEngines = {'linear': evalOffsetAssignment, 'heap': evalOffsetAssignmentHeap}
+
+
+def evalOffsetAssignmentBatch(taskSet, offsetsMatrix, previousMax = None, steadyState = False):
+    # Maximum normalized delay of each of the K offset assignments. Assignments exceeding previousMax get np.inf.
+    maxDelays, pruned = simulateBatch(taskSet, offsetsMatrix, steadyState = steadyState, previousMax = previousMax)
+    results = (maxDelays / np.array(taskPeriods(taskSet))).max(axis=1)
+    results[pruned] = np.inf
+    return results
+
+
 # -----------------------------------------------------------
 # Evaluate the setup that has the best results with the Simulation
 
@@ -205,18 +639,91 @@ def countPossibilities(listPeriods):
     return nPossibilities
 
 
-def evalBestSetup(taskSet, generator_offsetsAssignments):
+def canonicalOffsetGroups(taskSet, prefix = ()):
+    # Groups of consecutive tasks after the prefix, as (first task, number of tasks, lowest offset, offset range).
+    # Offset i is taken in [0, gcd(T_i, lcm(T_0..T_i-1)) ), so O_0 = 0 (time-shift normalization). A task identical to
+    # the previous one (same period and execution time) has a range of a whole period: swapping the offsets of two such
+    # consecutive tasks only relabels the schedule, so their offsets are taken in non-decreasing order. The optimum is
+    # kept when U < 1, where the delays only depend on the offsets modulo the periods up to a global shift.
+    # Identical tasks that are not consecutive are not grouped: a task between them wins or loses the call ties against
+    # each of them by index, so swapping their offsets can change the delays. Generated task sets almost never have two
+    # identical consecutive tasks, and get no reduction beyond calcNonEquivOffsets.
+    periods = taskPeriods(taskSet)
+    execTimes = taskExecTimes(taskSet)
+    ranges = calcNonEquivOffsets(periods)
+    n = len(taskSet)
+    ordered = [i > 0 and (periods[i], execTimes[i]) == (periods[i-1], execTimes[i-1]) for i in range(n)]
+
+    groups = []
+    i = len(prefix)
+    while i < n:
+        end = i + 1
+        if ordered[i]:
+            while end < n and ordered[end]: end += 1
+        lowest = prefix[i-1] if (ordered[i] and i == len(prefix) and ordered[i-1]) else 0
+        groups.append((i, end - i, lowest, ranges[i]))
+        i = end
+
+    return groups
+
+
+def canonicalOffsetAssignments(taskSet, prefix = ()):
+    # Generator of the canonical offset assignments (see canonicalOffsetGroups) starting with the offsets in prefix
+    groups = canonicalOffsetGroups(taskSet, prefix)
+
+    def assignments(k, assignment):
+        if k == len(groups):
+            yield tuple(assignment)
+            return
+        first, length, lowest, offsetRange = groups[k]
+        for groupOffsets in combinations_with_replacement(range(lowest, offsetRange), length):
+            yield from assignments(k + 1, assignment + list(groupOffsets))
+
+    return assignments(0, list(prefix))
+
+
+def countCanonicalAssignments(taskSet, prefix = ()):
+    # Number of assignments yielded by canonicalOffsetAssignments
+    nAssignments = 1
+    for first, length, lowest, offsetRange in canonicalOffsetGroups(taskSet, prefix):
+        nAssignments *= comb(offsetRange - lowest + length - 1, length)
+    return nAssignments
+
+
+def evalBestSetup(taskSet, generator_offsetsAssignments, engine = 'heap', steadyState = True, batchSize = None):
+
+    evalOffsetAssignment = evalEngines[engine]
 
     bestAssignment = list(next(generator_offsetsAssignments))
-    bestResult = evalOffsetAssignment(taskSet, bestAssignment)
+    bestResult = evalOffsetAssignment(taskSet, bestAssignment, steadyState = steadyState)
 
-    n = countPossibilities([task['period'] for task in taskSet])
+    n = countPossibilities(taskPeriods(taskSet))
     i = 1
 
     start = now()
+
+    if batchSize != None:
+        # Simulate the assignments by chunks of batchSize with the batch simulator
+        while True:
+            chunk = [list(assignment) for assignment in islice(generator_offsetsAssignments, batchSize)]
+            if chunk == []: break
+            chunkResults = evalOffsetAssignmentBatch(taskSet, chunk, bestResult, steadyState)
+
+            if i < 100000 <= i + len(chunk):
+                print(f'{datetime.now().strftime("%H:%M:%S")} | {i}/{n} Expected remaining time = {timedelta(seconds=(now() - start)*(n - i)/i)}')
+            i += len(chunk)
+
+            for assignment, localResult in zip(chunk, chunkResults):
+                if localResult <= bestResult:
+                    if localResult == 0: return assignment
+                    bestResult = localResult
+                    bestAssignment = assignment
+
+        return tuple(bestAssignment)
+
     for assignment in generator_offsetsAssignments:
 
-        localResult = evalOffsetAssignment(taskSet, list(assignment), bestResult)
+        localResult = evalOffsetAssignment(taskSet, list(assignment), bestResult, steadyState)
 
         i += 1
         
@@ -231,4 +738,80 @@ def evalBestSetup(taskSet, generator_offsetsAssignments):
                 bestResult = localResult
                 bestAssignment = list(assignment)
 
-    return tuple(bestAssignment) # return offset assignment (less sumDelay, less MaxDelay)
\ No newline at end of file
+    return tuple(bestAssignment) # return offset assignment (less sumDelay, less MaxDelay)
+
+
+# -----------------------------------------------------------
+# Parallel branch-and-bound for the best setup
+
+# State shared by the workers of evalBestSetupParallel, set by initBestSetupWorker in each process
+workerState = {}
+
+
+def initBestSetupWorker(taskSet, engine, steadyState, incumbent, zeroFound):
+    workerState.update(taskSet = taskSet, engine = engine, steadyState = steadyState,
+                       incumbent = incumbent, zeroFound = zeroFound)
+
+
+def evalBestSetupPrefix(prefix):
+    # Best assignment starting with the offsets in prefix, pruned with the incumbent shared by all the workers.
+    # Returns (result, assignment), or None if every assignment of the prefix is worse than the incumbent.
+    taskSet = workerState['taskSet']
+    evalOffsetAssignment = evalEngines[workerState['engine']]
+    steadyState = workerState['steadyState']
+    incumbent = workerState['incumbent']
+    zeroFound = workerState['zeroFound']
+
+    bestResult, bestAssignment = None, None
+    for k, assignment in enumerate(canonicalOffsetAssignments(taskSet, prefix)):
+        if k % 256 == 0 and zeroFound.is_set(): break
+
+        assignment = list(assignment)
+        localResult = evalOffsetAssignment(taskSet, assignment, incumbent.value, steadyState)
+        if localResult == None: continue
+
+        if bestResult == None or localResult < bestResult:
+            bestResult, bestAssignment = localResult, assignment
+            with incumbent.get_lock():
+                if localResult < incumbent.value: incumbent.value = localResult
+            if localResult == 0:
+                zeroFound.set()
+                break
+
+    return None if bestResult == None else (bestResult, bestAssignment)
+
+
+def evalBestSetupParallel(taskSet, nWorkers = None, prefixLength = None, engine = 'heap', steadyState = True):
+    # Exhaustive search of the canonical offset assignments (see canonicalOffsetAssignments), split into disjoint
+    # prefixes fixing the first prefixLength offsets, which are evaluated by a pool of nWorkers processes. The workers
+    # share the best normalized max delay found so far to prune, and stop as soon as a zero-delay assignment is found.
+    if nWorkers == None: nWorkers = cpu_count()
+
+    # Shortest prefix giving enough jobs to balance the load of the workers. The canonical assignments of the first
+    # tasks are the prefixes of the canonical assignments of the whole set.
+    if prefixLength == None:
+        prefixLength = 0
+        while prefixLength < len(taskSet) and countCanonicalAssignments(taskSet[:prefixLength]) < 8 * nWorkers:
+            prefixLength += 1
+    prefixes = canonicalOffsetAssignments(taskSet[:prefixLength])
+
+    # Initial incumbent: the first assignment, as in evalBestSetup
+    bestAssignment = [0] * len(taskSet)
+    bestResult = evalEngines[engine](taskSet, bestAssignment, steadyState = steadyState)
+    if bestResult == 0: return tuple(bestAssignment)
+
+    context = get_context('fork' if 'fork' in get_all_start_methods() else None)
+    incumbent = context.Value('d', bestResult)
+    zeroFound = context.Event()
+
+    with context.Pool(nWorkers, initBestSetupWorker, (taskSet, engine, steadyState, incumbent, zeroFound)) as pool:
+        for prefixResult in pool.imap(evalBestSetupPrefix, prefixes):
+            if prefixResult == None: continue
+            localResult, assignment = prefixResult
+            if localResult < bestResult:
+                bestResult, bestAssignment = localResult, assignment
+            if localResult == 0:
+                pool.terminate()
+                break
+
+    return tuple(bestAssignment)
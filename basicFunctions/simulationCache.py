@@ -0,0 +1,117 @@
+#
+# SIMULATION CACHE
+#
+# Memoization of simulation results (maximum delays), in memory and optionally on disk
+#
+# LIAS (ISAE-ENSMA)
+
+
+# -----------------------------------------------------------
+# Import
+
+from collections import OrderedDict
+from hashlib import sha1
+from pathlib import Path
+from functools import reduce
+from math import lcm
+import json
+import os
+
+from basicFunctions.simulation import getMaxDelays
+from basicFunctions.taskSet import taskPeriods, taskExecTimes
+
+
+# -----------------------------------------------------------
+# Cache
+
+def simulationKey(taskSet, offsets):
+    # Canonical hash of (periods, execution times, offsets). When the link is not overloaded (workload < hyperperiod),
+    # the maximum delays only depend on the offsets modulo the periods, so the offsets are normalized.
+    periods = [int(period) for period in taskPeriods(taskSet)]
+    execTimes = [int(execTime) for execTime in taskExecTimes(taskSet)]
+    offsets = [int(offset) for offset in offsets]
+
+    hyperperiod = reduce(lcm, periods)
+    if sum([execTimes[i] * (hyperperiod // periods[i]) for i in range(len(periods))]) < hyperperiod:
+        offsets = [offsets[i] % periods[i] for i in range(len(periods))]
+
+    return sha1(repr((periods, execTimes, offsets)).encode()).hexdigest()
+
+
+class SimulationCache:
+    # In-memory LRU of maxEntries simulation results, in front of an optional folder with one JSON file per result,
+    # whose least recently used files are deleted when the folder exceeds maxFolderSize bytes.
+    # Statistics: hits (in memory), diskHits and misses.
+
+    def __init__(self, maxEntries = 100000, folder = None, maxFolderSize = 100 * 2**20):
+        self.maxEntries = maxEntries
+        self.entries = OrderedDict()
+        self.stats = {'hits': 0, 'diskHits': 0, 'misses': 0}
+
+        self.folder = None if folder == None else Path(folder)
+        self.maxFolderSize = maxFolderSize
+        self.folderSize = 0
+        if self.folder != None:
+            self.folder.mkdir(parents=True, exist_ok=True)
+            self.folderSize = sum([file.stat().st_size for file in self.folder.glob('*.json')])
+
+
+    def get(self, key):
+        # Cached maximum delays, or None
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            self.stats['hits'] += 1
+            return self.entries[key]
+
+        if self.folder != None:
+            file = self.folder / (key + '.json')
+            try:
+                with open(file) as f: maxDelays = tuple(json.load(f))
+                os.utime(file)
+            except (OSError, ValueError):
+                maxDelays = None
+            if maxDelays != None:
+                self.stats['diskHits'] += 1
+                self.remember(key, maxDelays)
+                return maxDelays
+
+        self.stats['misses'] += 1
+        return None
+
+
+    def put(self, key, maxDelays):
+        maxDelays = tuple([int(delay) for delay in maxDelays])
+        self.remember(key, maxDelays)
+
+        if self.folder != None:
+            file = self.folder / (key + '.json')
+            if not file.exists():
+                with open(file, 'w') as f: json.dump(maxDelays, f)
+                self.folderSize += file.stat().st_size
+                if self.folderSize > self.maxFolderSize: self.evictFiles()
+
+
+    def remember(self, key, maxDelays):
+        self.entries[key] = maxDelays
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.maxEntries: self.entries.popitem(last = False)
+
+
+    def evictFiles(self):
+        # Delete the least recently used files until the folder is back to 90% of its maximum size
+        files = sorted([(file.stat().st_mtime, file) for file in self.folder.glob('*.json')])
+        for mtime, file in files:
+            if self.folderSize <= 0.9 * self.maxFolderSize: break
+            size = file.stat().st_size
+            file.unlink()
+            self.folderSize -= size
+
+
+    def getMaxDelays(self, taskSet, offsets, engine = 'heap', steadyState = False, stats = None):
+        # Same as simulation.getMaxDelays, simulating only on a cache miss
+        key = simulationKey(taskSet, offsets)
+        maxDelays = self.get(key)
+        if maxDelays == None:
+            maxDelays = getMaxDelays(taskSet, offsets, engine = engine, steadyState = steadyState, stats = stats)
+            self.put(key, maxDelays)
+        return list(maxDelays)
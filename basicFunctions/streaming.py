@@ -0,0 +1,47 @@
+#
+# STREAMING AGGREGATES
+#
+# Bounded-memory summaries of long streams of results
+#
+# LIAS (ISAE-ENSMA)
+
+
+# -----------------------------------------------------------
+# Import
+
+import random
+
+
+# -----------------------------------------------------------
+# Reservoir sampling
+
+class Reservoir:
+    # Uniform sample of at most size values of a stream (Vitter's algorithm R), with the exact count, sum, minimum and
+    # maximum of the stream. Uses its own random generator, so sampling does not change the draws of the task generation.
+
+    def __init__(self, size, seed = None):
+        self.size = size
+        self.values = []
+        self.count = 0
+        self.sum = 0
+        self.min = None
+        self.max = None
+        self.random = random.Random(seed)
+
+    def add(self, value):
+        self.count += 1
+        self.sum += value
+        if self.min == None or value < self.min: self.min = value
+        if self.max == None or value > self.max: self.max = value
+
+        if len(self.values) < self.size: self.values.append(value)
+        else:
+            r = self.random.randrange(self.count)
+            if r < self.size: self.values[r] = value
+
+    def extend(self, values):
+        for value in values: self.add(value)
+
+    @property
+    def mean(self):
+        return self.sum / self.count if self.count else None
@@ -0,0 +1,121 @@
+#
+# TASK SET
+#
+# Compact task set, with periods and execution times stored in integer arrays
+#
+# LIAS (ISAE-ENSMA)
+
+
+# -----------------------------------------------------------
+# Import
+
+from array import array
+from math import lcm
+from functools import reduce
+
+
+# -----------------------------------------------------------
+# Task set
+
+class Task:
+    # Read-only view of one task of a TaskSet, used like the task dicts: task['period'], task['execTime'],
+    # 'phase' in task, dict(task)
+    __slots__ = ('taskSet', 'i')
+
+    def __init__(self, taskSet, i):
+        self.taskSet = taskSet
+        self.i = i
+
+    def __getitem__(self, key):
+        if key == 'period': return self.taskSet.periods[self.i]
+        if key == 'execTime': return self.taskSet.execTimes[self.i]
+        if key == 'phase' and self.taskSet.phases != None and self.taskSet.phases[self.i] != None:
+            return self.taskSet.phases[self.i]
+        raise KeyError(key)
+
+    def __contains__(self, key):
+        return key in self.keys()
+
+    def get(self, key, default = None):
+        return self[key] if key in self else default
+
+    def keys(self):
+        if self.taskSet.phases != None and self.taskSet.phases[self.i] != None: return ('period', 'execTime', 'phase')
+        return ('period', 'execTime')
+
+    def __repr__(self):
+        return repr(dict(self))
+
+
+class TaskSet:
+    # Periods and execution times of n tasks in contiguous 64-bit integer arrays, and optional phases (None for the
+    # tasks without a phase). Indexing gives Task views, so a TaskSet can be used wherever a tuple of task dicts is.
+    __slots__ = ('periods', 'execTimes', 'phases', 'hyperperiodCache')
+
+    def __init__(self, periods, execTimes, phases = None):
+        self.periods = array('q', periods)
+        self.execTimes = array('q', execTimes)
+        if len(self.periods) != len(self.execTimes): raise ValueError('Periods and execution times must have the same length')
+        self.phases = None if (phases == None or all([phase == None for phase in phases])) else tuple(phases)
+        self.hyperperiodCache = None
+
+    @classmethod
+    def fromTasks(cls, tasks):
+        # TaskSet from a sequence of task dicts (returned unchanged if already a TaskSet)
+        if isinstance(tasks, TaskSet): return tasks
+        return cls([int(task['period']) for task in tasks], [int(task['execTime']) for task in tasks],
+                   [task.get('phase') for task in tasks])
+
+    def toTasks(self):
+        # Tuple of task dicts
+        return tuple([dict(task) for task in self])
+
+    def __len__(self):
+        return len(self.periods)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return TaskSet(self.periods[index], self.execTimes[index], None if self.phases == None else self.phases[index])
+        if index < 0: index += len(self.periods)
+        if not 0 <= index < len(self.periods): raise IndexError('task index out of range')
+        return Task(self, index)
+
+    def __iter__(self):
+        return (Task(self, i) for i in range(len(self.periods)))
+
+    def __eq__(self, other):
+        return isinstance(other, TaskSet) and (self.periods, self.execTimes, self.phases) == (other.periods, other.execTimes, other.phases)
+
+    def __hash__(self):
+        return hash((self.periods.tobytes(), self.execTimes.tobytes(), self.phases))
+
+    def __repr__(self):
+        return f'TaskSet({list(self.periods)}, {list(self.execTimes)}' + ('' if self.phases == None else f', {list(self.phases)}') + ')'
+
+    def __getstate__(self):
+        return (self.periods, self.execTimes, self.phases)
+
+    def __setstate__(self, state):
+        self.periods, self.execTimes, self.phases = state
+        self.hyperperiodCache = None
+
+    @property
+    def hyperperiod(self):
+        if self.hyperperiodCache == None: self.hyperperiodCache = reduce(lcm, self.periods, 1)
+        return self.hyperperiodCache
+
+    @property
+    def utilization(self):
+        return sum([self.execTimes[i] / self.periods[i] for i in range(len(self.periods))])
+
+
+def taskPeriods(taskSet):
+    # Periods of a TaskSet (its array, without conversion) or of a sequence of task dicts
+    if isinstance(taskSet, TaskSet): return taskSet.periods
+    return [task['period'] for task in taskSet]
+
+
+def taskExecTimes(taskSet):
+    # Execution times of a TaskSet (its array, without conversion) or of a sequence of task dicts
+    if isinstance(taskSet, TaskSet): return taskSet.execTimes
+    return [task['execTime'] for task in taskSet]
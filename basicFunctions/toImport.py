@@ -1,10 +1,11 @@
-from math import gcd, lcm, sqrt
-from functools import reduce
+from math import gcd, lcm, isqrt
+from functools import reduce, lru_cache
 from typing import Counter
 from sys import exit
 from os import path
 from itertools import islice
 from copy import deepcopy
+import numpy as np
 
 # -----------------------------------------------------------
 #create a list class without out of range
@@ -28,71 +29,91 @@ def f_None_Zero(list):
 def lcm(a, b):
     return abs(a*b) // gcd(a, b)
 
-def primeFactors(n: int):
-    if n < 0:
-        raise ValueError(f'Tried factoring {n} but input must be positive!')
-    primes = [2, 3]
+# -----------------------------------------------------------
+# Prime factorization, shared by all modules: smallest prime factor sieve, grown as larger numbers are factored
+# (up to sieveMaxSize, then trial division by its primes), and the factorizations kept in a LRU cache
+
+sieveMaxSize = 2**22
+_smallestPrimeFactors = np.zeros(2, dtype=np.int32)
+_sievePrimes = []
+
+
+def smallestPrimeFactorSieve(n):
+    # Array of the smallest prime factor of every integer up to at least n (at most sieveMaxSize)
+    global _smallestPrimeFactors, _sievePrimes
+    if n >= len(_smallestPrimeFactors) and len(_smallestPrimeFactors) <= sieveMaxSize:
+        size = min(max(n + 1, 2 * len(_smallestPrimeFactors)), sieveMaxSize + 1)
+        sieve = np.zeros(size, dtype=np.int32)
+        for p in range(2, isqrt(size - 1) + 1):
+            if sieve[p] == 0:
+                multiples = sieve[p*p::p]
+                multiples[multiples == 0] = p
+        primes = np.flatnonzero(sieve[2:] == 0) + 2
+        sieve[primes] = primes
+        _smallestPrimeFactors, _sievePrimes = sieve, primes.tolist()
+    return _smallestPrimeFactors
+
+
+@lru_cache(maxsize=2**16)
+def factorize(n: int):
+    # Prime factors of a positive integer with their powers, by increasing prime: ((p1, k1), (p2, k2), ...)
+    sieve = smallestPrimeFactorSieve(n)
     factors = []
-    if n % 2 == 0:
-        factors.append(2)
-        while n % 2 == 0:
-            n /= 2
-    prime = primes[1]
-    while prime <= n:
-        if n % prime == 0:
-            factors.append(prime)
-            while n % prime == 0:
-                n /= prime
-        else:
-            isPrime = False
-            while not isPrime:
-                prime += 2
-                isPrime = True
-                for p in primes:
-                    if prime % p == 0:
-                        isPrime = False
-                        break
+
+    # Beyond the sieve: trial division by its primes, then by the odd numbers after them, until the rest is in the sieve
+    for p in _sievePrimes if n >= len(sieve) else []:
+        if n < len(sieve) or p * p > n: break
+        if n % p == 0:
+            k = 0
+            while n % p == 0:
+                n //= p
+                k += 1
+            factors.append((p, k))
+    p = len(sieve) | 1
+    while n >= len(sieve):
+        if p * p > n:
+            factors.append((n, 1))
+            n = 1
+        elif n % p == 0:
+            k = 0
+            while n % p == 0:
+                n //= p
+                k += 1
+            factors.append((p, k))
+        p += 2
+
+    while n > 1:
+        p = int(sieve[n])
+        k = 0
+        while n % p == 0:
+            n //= p
+            k += 1
+        factors.append((p, k))
     return tuple(factors)
 
-# -----------------------------------------------------------
-# Python program to print prime factors
 
+def _integer(n):
+    # n as an int, for integral numbers of any type (int, float, Fraction, NumPy integer)
+    if n != int(n): raise ValueError(f'Tried factoring {n} but input must be an integer!')
+    return int(n)
 
-# A function to print all prime factors of
-# a given number n
-def primeFactorsCount(n):
-	
-	# Print the number of two's that divide n
-    List=[]
-    while n % 2 == 0:
-        List.append(2)
-        #print(2)
-        n = int(n / 2)
-		
-    # n must be odd at this point
-    # so a skip of 2 ( i = i + 2) can be used
-    for i in range(3,int(sqrt(n))+1,2):
-		
-        # while i divides n , print i ad divide n
-        while n % i== 0:
-            List.append(i)
-            #print(i)
-            n = int(n / i)
-			
-    # Condition if n is a prime
-    # number greater than 2
-    if n > 2:
-        List.append(n)
-        #print(n)
-    c = Counter(List)
-    c=list(c.items())
-    #print('c : ',c)
-    return c
 
-print()
-# This function's code is contributed by Harshit Agrawal
+def primeFactors(n: int):
+    # Distinct prime factors of a positive integer, by increasing value
+    n = _integer(n)
+    if n < 1:
+        raise ValueError(f'Tried factoring {n} but input must be positive!')
+    return tuple([p for p, k in factorize(n)])
 
 
+def primeFactorsCount(n):
+    # Prime factors of a positive integer with their powers, by increasing prime: [(p1, k1), (p2, k2), ...]
+    n = _integer(n)
+    if n < 1:
+        raise ValueError(f'Tried factoring {n} but input must be positive!')
+    return list(factorize(n))
+
+print()
 
 
 def calcNonEquivOffsets( listPeriods ):
@@ -31,6 +31,12 @@ optim_z3_sum = False                 # True | False -- Enable analysis of Optimi
 
 verbose = False     # Print progress while doing analysis
 
+simulationEngine = 'heap'   # 'linear' | 'heap' -- Simulator used to get maximum delays (same results, 'heap' is faster)
+simSteadyState = True       # True | False -- Stop simulations once the schedule is periodic instead of at 2 * hyperperiod + max(offsets) (same results)
+simCache = True             # True | False -- Simulate only once identical task sets and offsets (offsets modulo periods when U < 1)
+simCacheFolder = None       # None | folder name -- Also keep the simulation results on disk, to reuse them in later runs
+simCacheMaxSize = 100       # MB -- Maximum size of simCacheFolder, least recently used results are deleted beyond
+
 optimTimeLimit = 10  # seconds
 
 
@@ -44,7 +50,9 @@ from time import time as now
 from copy import deepcopy
 from heapq import nlargest
 
-from basicFunctions.simulation import getMaxDelaysFromSim
+from basicFunctions.simulation import getMaxDelays
+from basicFunctions.simulationCache import SimulationCache
+from basicFunctions.taskSet import TaskSet
 from basicFunctions.boxplot import printBoxplot4
 
 from scheduling.ladeira import heuristicScheduling
@@ -174,6 +182,7 @@ case_taskSet = tuple(case_taskSet)
 case_taskSet[9]['phase'] = 0
 case_taskSet[10]['phase'] = 0
 case_taskSet[11]['phase'] = 0
+case_taskSet = TaskSet.fromTasks(case_taskSet)
 
 # outputFolder = outputFolderRoot 
 Path(outputFolderRoot).mkdir(parents=True, exist_ok=False)
@@ -223,8 +232,15 @@ for algorithm in list_algorithms:
 
 # !!! Import offsets ??
 
+if simCache:
+    simCacheStore = SimulationCache(folder = simCacheFolder, maxFolderSize = simCacheMaxSize * 2**20)
+    simGetMaxDelays = simCacheStore.getMaxDelays
+else:
+    simGetMaxDelays = getMaxDelays
+
 for result in list_results:
-    maxDelays = getMaxDelaysFromSim(case_taskSet, [ O_i for O_i in result['offsets'] ] )
+    result['simStats'] = {}
+    maxDelays = simGetMaxDelays(case_taskSet, [ O_i for O_i in result['offsets'] ], engine = simulationEngine, steadyState = simSteadyState, stats = result['simStats'] )
     result['maxDelays'] = tuple( maxDelays )
     result['schedulable'] = True
     for i, delay in enumerate(result['maxDelays']):
@@ -240,8 +256,11 @@ with open(outputFolderRoot + '/results.txt', "w") as file:
         file.write( f'{result["name"]}: ({result["calcTime"]:.2e})\n\n' )
         file.write( f'Offsets: {result["offsets"]}\n')
         file.write( f'Maximum delays: {result["maxDelays"]}\n')
-        if result['schedulable']: file.write( f'Schedulable.\n\n')
-        else: file.write( f'Not schedulable.\n\n')
+        if result['schedulable']: file.write( f'Schedulable.\n')
+        else: file.write( f'Not schedulable.\n')
+        if result['simStats']: file.write( f'Simulated jobs ({simulationEngine}): {result["simStats"].get("events", 0)}\n')
+        file.write('\n')
+    if simCache: file.write( f'Simulation cache: {simCacheStore.stats["hits"]} hits -- {simCacheStore.stats["diskHits"]} disk hits -- {simCacheStore.stats["misses"]} misses\n')
 
 
 functionNameList = tuple([result['name'] for result in list_results])
@@ -11,6 +11,9 @@
 import numpy as np
 import random
 import csv
+from math import ceil
+from functools import lru_cache
+from collections import Counter
 from drs import drs
 
 
@@ -25,6 +28,12 @@ def getMatrixFromFile(periodFactorFile):
     return matrix
 
 
+@lru_cache(maxsize=None)
+def loadFactorMatrix(periodFactorFile):
+    # Same matrix as getMatrixFromFile (as a tuple of tuples), read only once per process
+    return tuple([tuple(row) for row in getMatrixFromFile(periodFactorFile)])
+
+
 # -----------------------------------------------------------
 # Algorithm 1
 
@@ -64,7 +73,7 @@ def generateTaskSet(factorMatrix, n, u1, u2, U, granularity = 1, minExecTime = 1
 # Adapted Algorithm 2 -- added DRS
 
 def generateTaskSetDRS(periodFactorFile, n, U, uMin = 0, uMax = 1, granularity = 1, minExecTime = 1) :    
-    factorMatrix = getMatrixFromFile(periodFactorFile)
+    factorMatrix = loadFactorMatrix(periodFactorFile)
     task_set = []
     i = 0
     uVec = drs(n, U, [uMax]*n, [uMin]*n)
@@ -80,12 +89,203 @@ def generateTaskSetDRS(periodFactorFile, n, U, uMin = 0, uMax = 1, granularity =
     else: return tuple(task_set)
 
 
+# -----------------------------------------------------------
+# Batched Algorithms 1 and 2 (with DRS): many task sets at once, with NumPy arrays
+# Every draw is made with rng, a NumPy Generator (a new one seeded from the OS when None), so that a seeded rng gives
+# the same task sets in any process
+
+@lru_cache(maxsize=None)
+def loadFactorArrays(periodFactorFile):
+    # Rows of the factor matrix as integer arrays, read only once per process
+    factorArrays = tuple([np.array(row, dtype=np.int64) for row in loadFactorMatrix(periodFactorFile)])
+    if np.prod([float(row.max()) for row in factorArrays]) >= 2**63: raise ValueError('Periods of ' + periodFactorFile + ' do not fit in 64-bit integers')
+    return factorArrays
+
+
+def generatePeriodsFromFactorArrays(factorArrays, shape, rng = None):
+    # Algorithm 1 for an array of periods of the given shape: one factor drawn uniformly in each row
+    if rng == None: rng = np.random.default_rng()
+    periods = np.ones(shape, dtype=np.int64)
+    for row in factorArrays:
+        periods *= row[rng.integers(0, len(row), size=shape)]
+    return periods
+
+
+def generateUtilizations(numberSets, n, U, uMin = 0, uMax = 1, rng = None):
+    # numberSets x n utilizations summing to U, drawn by DRS in [uMin, uMax]. When the bounds cannot be reached
+    # (uMin = 0 and uMax >= U), DRS is uniform on the simplex, i.e. a flat Dirichlet distribution, drawn all at once.
+    # Otherwise drs draws with the random module, which is seeded from rng for each set.
+    if rng == None: rng = np.random.default_rng()
+    if uMin == 0 and uMax >= U: return U * rng.dirichlet(np.ones(n), size=numberSets)
+    list_u = []
+    for seed in rng.integers(0, 2**63, size=numberSets).tolist():
+        random.seed(seed)
+        list_u.append(drs(n, U, [uMax]*n, [uMin]*n))
+    return np.array(list_u)
+
+
+def generateExecTimes(periods, U, uMin = 0, uMax = 1, granularity = 1, rng = None):
+    # Execution times of the sets (rows) of an array of periods, with DRS utilizations, as in generateTaskSetDRS
+    utilizations = generateUtilizations(periods.shape[0], periods.shape[1], U, uMin, uMax, rng)
+    return (np.round(utilizations * periods / granularity) * granularity).astype(np.int64)
+
+
+def drawAcceptedSets(drawSets, numberSets, n, accept, batchSize = 100000, stats = None):
+    # numberSets x n arrays of periods and execution times, from the sets of drawSets(size) (arrays of size sets) that
+    # accept (function of these arrays, giving one boolean per set) keeps. Sets are drawn by batches of at most
+    # batchSize, sized from the acceptance rate so far. Adds the numbers of drawn and accepted sets to stats.
+    periods = np.zeros((numberSets, n), dtype=np.int64)
+    execTimes = np.zeros((numberSets, n), dtype=np.int64)
+
+    done = 0
+    drawn = 0
+    while done < numberSets:
+        size = min(batchSize, max(numberSets - done, -(-(numberSets - done) * drawn // max(done, 1))))
+        newPeriods, newExecTimes = drawSets(size)
+        accepted = np.flatnonzero(accept(newPeriods, newExecTimes))[:numberSets - done]
+
+        periods[done:done + len(accepted)] = newPeriods[accepted]
+        execTimes[done:done + len(accepted)] = newExecTimes[accepted]
+        done += len(accepted)
+        drawn += size
+
+    if stats != None:
+        stats['drawnSets'] = stats.get('drawnSets', 0) + drawn
+        stats['acceptedSets'] = stats.get('acceptedSets', 0) + numberSets
+    return periods, execTimes
+
+
+def generateTaskSetsDRS(periodFactorFile, numberSets, n, U, uMin = 0, uMax = 1, granularity = 1, minExecTime = 1, accept = None, batchSize = 100000, stats = None, rng = None):
+    # Same distribution as numberSets calls of generateTaskSetDRS, returned as numberSets x n arrays of periods and of
+    # execution times. Sets with an execution time below minExecTime, or rejected by accept (function of the periods
+    # and execution times arrays of a batch, giving one boolean per set), are drawn again in the next batches.
+    factorArrays = loadFactorArrays(periodFactorFile)
+    if rng == None: rng = np.random.default_rng()
+
+    def drawSets(size):
+        periods = generatePeriodsFromFactorArrays(factorArrays, (size, n), rng)
+        return periods, generateExecTimes(periods, U, uMin, uMax, granularity, rng)
+
+    def acceptSets(periods, execTimes):
+        accepted = (execTimes >= minExecTime).all(axis=1)
+        if accept != None: accepted &= accept(periods, execTimes)
+        return accepted
+
+    return drawAcceptedSets(drawSets, numberSets, n, acceptSets, batchSize, stats)
+
+
+# -----------------------------------------------------------
+# Semi-harmonic task sets (GCD of the periods larger than every execution time), drawn by strata of common factors
+
+def gcdAboveExecTimes(periods, execTimes):
+    # Sets (rows of the arrays) whose GCD of periods is larger than every execution time
+    return np.gcd.reduce(periods, axis=1) > execTimes.max(axis=1)
+
+
+def generatePeriodsInStratum(factorRows, stratum, shape, rng):
+    # Periods of shape (sets, n) whose smallest factor in each row r of the matrix is the value of index stratum[r]
+    # (factorRows: distinct values of each row and their probabilities). The factors of a row are drawn among the
+    # values not below the smallest one, again for the sets where none is the smallest one.
+    periods = np.ones(shape, dtype=np.int64)
+    for (values, probabilities), j in zip(factorRows, stratum):
+        p = probabilities[j:] / probabilities[j:].sum()
+        factors = rng.choice(len(p), size=shape, p=p)
+        missing = np.flatnonzero((factors != 0).all(axis=1))
+        while len(missing) > 0:
+            factors[missing] = rng.choice(len(p), size=(len(missing), shape[1]), p=p)
+            missing = missing[(factors[missing] != 0).all(axis=1)]
+        periods *= values[j + factors]
+    return periods
+
+
+def semiHarmonicSets(periods, execTimes, minExecTime = 1):
+    # Sets (rows of the arrays) kept by generateTaskSetsDRS filtered by gcdAboveExecTimes
+    return (execTimes >= minExecTime).all(axis=1) & gcdAboveExecTimes(periods, execTimes)
+
+
+@lru_cache(maxsize=None)
+def semiHarmonicStrata(periodFactorFile, n, U, uMin, uMax, granularity, minExecTime, tolerance, pilotSets, batchSize, pilotSeed = None):
+    # Strata of the task sets by their smallest factor in each row of the matrix (so by the common factor of their
+    # periods when the rows are powers of distinct primes), with the share of the semi-harmonic sets in each stratum,
+    # estimated from pilotSets semi-harmonic sets drawn by rejection (standard error sqrt(share (1 - share) / pilotSets)).
+    # Strata with a share below tolerance are left out, as well as those not met in the pilot sets: their share is
+    # estimated as the share of the pilot sets whose stratum was met only once (Good-Turing), and counted in the share
+    # left out. The pilot sets are drawn with the seed pilotSeed (from the OS when None, then kept for the process by
+    # the cache).
+    # Returns the distinct values and probabilities of each row, the kept strata, their shares, the share left out and
+    # the number of sets drawn for the pilot.
+    factorRows = []
+    for row in loadFactorArrays(periodFactorFile):
+        values, counts = np.unique(row, return_counts=True)
+        factorRows.append( (values, counts / len(row)) )
+
+    rng = np.random.default_rng(pilotSeed)
+    strataCounts = Counter()
+    found = 0
+    drawn = 0
+    while found < pilotSets:
+        periods = np.ones((batchSize, n), dtype=np.int64)
+        strata = np.zeros((batchSize, len(factorRows)), dtype=np.int64)
+        for r, (values, probabilities) in enumerate(factorRows):
+            factors = rng.choice(len(values), size=(batchSize, n), p=probabilities)
+            periods *= values[factors]
+            strata[:, r] = factors.min(axis=1)
+        accepted = semiHarmonicSets(periods, generateExecTimes(periods, U, uMin, uMax, granularity, rng), minExecTime)
+        strataCounts.update( [ tuple(stratum) for stratum in strata[accepted].tolist() ] )
+        found += accepted.sum()
+        drawn += batchSize
+
+    list_strata = list(strataCounts)
+    counts = np.array([strataCounts[stratum] for stratum in list_strata])
+    shares = counts / found
+    kept = shares >= tolerance
+    unseenShare = (counts == 1).sum() / found
+    droppedShare = 1 - (1 - unseenShare) * shares[kept].sum()
+    return tuple(factorRows), tuple([list_strata[i] for i in np.flatnonzero(kept)]), shares[kept] / shares[kept].sum(), droppedShare, drawn
+
+
+def generateSemiHarmonicTaskSetsDRS(periodFactorFile, numberSets, n, U, uMin = 0, uMax = 1, granularity = 1, minExecTime = 1,
+                                    tolerance = 0.001, pilotSets = None, batchSize = 100000, stats = None, rng = None, pilotSeed = None):
+    # Semi-harmonic task sets with the distribution of generateTaskSetsDRS filtered by gcdAboveExecTimes, apart from
+    # the error on the shares of the strata estimated by semiHarmonicStrata and the strata it leaves out (their share
+    # is put in stats['droppedShare']). These are the strata where semi-harmonic sets are the rarest, so the ones
+    # that cost the most draws. The number of sets of each stratum is drawn from the shares, then the sets of a
+    # stratum are drawn directly with its smallest factors, and filtered.
+    # By default the pilot has 20 / tolerance sets, so that a stratum at the tolerance is met about 20 times in it
+    # (share known to about 22%), and every stratum above it almost surely.
+    # Returns numberSets x n arrays of periods and execution times, in random order. The pilot sets are drawn with
+    # pilotSeed rather than rng, so that they are drawn once for all the calls of a run: their number is put in
+    # stats['pilotDrawnSets'], apart from stats['drawnSets'].
+    if pilotSets == None: pilotSets = ceil(20 / tolerance)
+    factorRows, list_strata, shares, droppedShare, pilotDrawn = semiHarmonicStrata(periodFactorFile, n, U, uMin, uMax, granularity, minExecTime,
+                                                                                   tolerance, pilotSets, batchSize, pilotSeed)
+    if stats != None:
+        stats['droppedShare'] = droppedShare
+        stats['pilotDrawnSets'] = pilotDrawn
+    if numberSets == 0: return np.zeros((0, n), dtype=np.int64), np.zeros((0, n), dtype=np.int64)
+
+    if rng == None: rng = np.random.default_rng()
+    list_periods = []
+    list_execTimes = []
+    for stratum, count in zip(list_strata, rng.multinomial(numberSets, shares)):
+        if count == 0: continue
+        def drawSets(size):
+            periods = generatePeriodsInStratum(factorRows, stratum, (size, n), rng)
+            return periods, generateExecTimes(periods, U, uMin, uMax, granularity, rng)
+        periods, execTimes = drawAcceptedSets(drawSets, count, n, lambda periods, execTimes: semiHarmonicSets(periods, execTimes, minExecTime), batchSize, stats)
+        list_periods.append(periods)
+        list_execTimes.append(execTimes)
+
+    order = rng.permutation(numberSets)
+    return np.concatenate(list_periods)[order], np.concatenate(list_execTimes)[order]
+
+
 # -----------------------------------------------------------
 # Generate task from matrix in csv file
 
 def generateMessageSet(periodFactorFile, n, u1=0, u2=0, U=1, bitsPerByte=10, headerSize_bytes=9):
     if u2==0: u2 = U/n
-    factorMatrix = getMatrixFromFile(periodFactorFile)
+    factorMatrix = loadFactorMatrix(periodFactorFile)
     messageSet = generateTaskSet(factorMatrix, n, u1, u2, U, granularity = bitsPerByte, minExecTime = headerSize_bytes * bitsPerByte)
     return messageSet
 
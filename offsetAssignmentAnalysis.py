@@ -35,26 +35,53 @@ numberTasks = 16    # Number of tasks to generate for each set
 U_target = 0.98      # Utilization factor, between 0 and 1
 verbose = False     # Print progress while doing analysis
 
+simulationEngine = 'heap'   # 'linear' | 'heap' -- Simulator used to get maximum delays (same results, 'heap' is faster)
+simSteadyState = True       # True | False -- Stop simulations once the schedule is periodic instead of at 2 * hyperperiod + max(offsets) (same results)
+simCache = True             # True | False -- Simulate only once identical task sets and offsets (offsets modulo periods when U < 1)
+simCacheFolder = None       # None | folder name -- Also keep the simulation results on disk, to reuse them in later runs
+simCacheMaxSize = 100       # MB -- Maximum size of simCacheFolder, least recently used results are deleted beyond
+
 optimTimeLimit = None  # seconds
 
+numberWorkers = 1   # Number of processes calculating offsets and simulating (1: serial). Each calculation time is measured in its own process
+simChunkSize = 64   # Number of (task set, algorithm) pairs sent at once to a simulation process
+batchChunkSize = 1000   # Number of task sets scheduled at once by the algorithms with a batch version (New Heuristics), outside streaming mode (at most numberSets / numberWorkers)
+
+generationBatchSize = 10000     # Number of task sets drawn at once by the generator (and generated ahead in streaming mode)
+filterSampling = 'rejection'    # 'rejection' | 'direct' -- With filterSets, draw sets until they pass the filter, or draw them directly among the common factors that pass it (faster, approximate)
+filterTolerance = 0.001         # With filterSampling = 'direct', smallest share of the filtered sets for a common factor to be drawn (pilot of 20 / filterTolerance sets)
+
+masterSeed = None   # None | integer -- Seed of every random draw (task sets, Goossens heuristics): same task sets and offsets for the same seed, serial or parallel. None: drawn, written in log.txt
+
+streaming = False           # True | False -- Generate, schedule, simulate and write each task set before the next one, in constant memory (serial)
+streamingSampleSize = 100000    # Number of values of each delay metric kept (uniform sample) for the plots in streaming mode
+
 
 # -----------------------------------------------------------
 # Import
 
 from pathlib import Path
+import argparse
 import csv
-from time import time as now
+import json
 from datetime import datetime
-from math import gcd
-from functools import reduce
-from copy import deepcopy
+from collections import deque
+import numpy as np
+import random
+import zlib
 from heapq import nlargest
 
-from generation.messageSetGeneration import generateTaskSetDRS, getMatrixFromFile
-from basicFunctions.simulation import getMaxDelaysFromSim
+from generation.messageSetGeneration import generateTaskSetsDRS, generateSemiHarmonicTaskSetsDRS, gcdAboveExecTimes, getMatrixFromFile
+from basicFunctions.simulation import getMaxDelays
+from basicFunctions.simulationCache import SimulationCache
+from basicFunctions.taskSet import TaskSet
+from basicFunctions.parallel import createPool, runOffsetJob, runOffsetJobs, runBatchOffsetJobs, simulatePairs
+from basicFunctions.streaming import Reservoir
+from basicFunctions.results import ResultStore
+from basicFunctions.checkpoint import RecordLog, readTaskSets, loadRun
 from basicFunctions.boxplot import printBoxplot4
 
-from scheduling.ladeira import heuristicScheduling
+from scheduling.ladeira import heuristicScheduling, heuristicSchedulingBatch
 from scheduling.goossens import goossensCoupledScheduling, goossensScheduling, goossensModifiedScheduling
 from scheduling.can import CANScheduling
 from scheduling.paparazzi import paparazziScheduling
@@ -68,75 +95,390 @@ from optim.z3py import optimizeZ3_Max, optimizeZ3_Sum
 # -----------------------------------------------------------
 # Functions
 
-def evalCoupledSchedHeur(heuristicFunction, list_taskSets):
-    # Evaluate Coupled Scheduling Heuristics
-
-    list_calcTime = []
-
-    list_offsetAssignments_orig = []
-    list_offsetAssignments_mod = []
-
-    n = len(list_taskSets)
-    i = 0
-
-    for taskSet in list_taskSets:
-
-        # Get time for calculating offsets
-        start = now()
-        coupledOffsets = heuristicFunction(taskSet)
-        end = now()
-        list_calcTime.append(end - start)
-        list_offsetAssignments_orig.append( tuple(coupledOffsets[0]) )
-        list_offsetAssignments_mod.append( tuple(coupledOffsets[1]) )
-        i += 1
-
-    return ( {'calcTimes': tuple(list_calcTime), 'offsets': tuple(list_offsetAssignments_orig)},
-            {'calcTimes': tuple(list_calcTime), 'offsets': tuple(list_offsetAssignments_mod)} )
-
-
-def evalSchedHeur(heuristicFunction, list_taskSets):
-    # Evaluate Scheduling Heuristics
-
-    list_calcTime = []
-
-    list_offsetAssignments = []
-
-    n = len(list_taskSets)
-    i = 0
-
-    for taskSet in list_taskSets:
-
-        # Get time for calculating offsets
-        start = now()
-        offsets = heuristicFunction(taskSet)
-        end = now()
-        list_calcTime.append(end - start)
-        list_offsetAssignments.append( tuple(offsets) )
-        i += 1
-
-    return {'calcTimes': tuple(list_calcTime), 'offsets': tuple(list_offsetAssignments)}
-
-    
-def evalOptimAlgo(optimAlgorithm, list_taskSets, timeLimit=None):
-    # Evaluate Optimization Algorithm
-
-    list_calcTime = []
+def childSeed(masterSeed, *key):
+    # Seed of the random draws identified by key (stage, set...), derived from the master seed: the draws of a set do
+    # not depend on the order in which the sets are processed, nor on the process doing them
+    return int(np.random.SeedSequence(masterSeed, spawn_key=key).generate_state(1, np.uint64)[0])
+
+
+# Flags that change the task sets drawn for a master seed, saved in parameters.json with the other parameters of a run
+generationFlags = ('factorMatrixFile', 'generationBatchSize', 'filterSampling', 'filterTolerance')
+
+
+def generateFilteredTaskSets(generation, numberSets, numberTasks, U_target, filterSets, masterSeed, start = 0, stop = None, stats = None):
+    # Task sets start to stop (numberSets by default) of a run of numberSets sets (with a GCD of periods larger than every
+    # execution time, if filterSets), with the generation flags of the run (dict of generationFlags). They are drawn by
+    # blocks of generationBatchSize sets, each with its own seed, so that a range of sets is the same as in the whole run
+    # (the block of start is drawn again from its beginning)
+
+    factorMatrixFile, generationBatchSize = generation['factorMatrixFile'], generation['generationBatchSize']
+    filterSampling, filterTolerance = generation['filterSampling'], generation['filterTolerance']
+    if stop == None: stop = numberSets
+    list_taskSets = []
+    if start >= stop: return list_taskSets
+    for blockStart in range(start - start % generationBatchSize, stop, generationBatchSize):
+        blockSize = min(generationBatchSize, numberSets - blockStart)
+        rng = np.random.default_rng(childSeed(masterSeed, 0, blockStart))
+        if filterSets and filterSampling == 'direct':
+            periods, execTimes = generateSemiHarmonicTaskSetsDRS(factorMatrixFile, blockSize, numberTasks, U_target, tolerance = filterTolerance,
+                                                                 batchSize = generationBatchSize, stats = stats, rng = rng, pilotSeed = childSeed(masterSeed, 2))
+        else:
+            periods, execTimes = generateTaskSetsDRS(factorMatrixFile, blockSize, numberTasks, U_target, accept = gcdAboveExecTimes if filterSets else None,
+                                                     batchSize = generationBatchSize, stats = stats, rng = rng)
+        for j in range(max(start, blockStart) - blockStart, min(stop, blockStart + blockSize) - blockStart):
+            list_taskSets.append( TaskSet(periods[j].tolist(), execTimes[j].tolist()) )
+
+    return list_taskSets
+
+
+def getJobArguments(algorithm, masterSeed, i):
+    # Keyword arguments of the offset calculation of an algorithm for set i: the time limit of the solvers, and a random
+    # generator seeded for this (algorithm, set) pair for the randomized heuristics
+    kwargs = {'timeLimit_Sec': optimTimeLimit} if algorithm.get('optimization') else {}
+    if algorithm.get('randomized'): kwargs['rng'] = random.Random( childSeed(masterSeed, 1, zlib.crc32(algorithm['name'].encode()), i) )
+    return kwargs
+
+
+def getDelayMetrics(taskSet, maxDelays):
+    # Maximum delays of the tasks of a set: absolute, per period, per largest execution time among the other tasks,
+    # and maximum response time per execution time
+
+    largestExecTimes = nlargest(2, taskSet.execTimes)
+    otherMaxExecTimes = [ largestExecTimes[1 if (execTime == largestExecTimes[0]) else 0] for execTime in taskSet.execTimes ]
+    n = len(taskSet)
+
+    return ( tuple(maxDelays),
+             tuple( [ maxDelays[j]/taskSet.periods[j] for j in range(n) ] ),
+             tuple( [ maxDelays[j]/otherMaxExecTimes[j] for j in range(n) ] ),
+             tuple( [ (maxDelays[j] + taskSet.execTimes[j])/taskSet.execTimes[j] for j in range(n) ] ) )
+
+
+def getAlgorithms(flags):
+    # Algorithms to compare: those whose flag (heur_new, heur_paparazzi, ..., optim_z3_sum) is True in the dict flags
+
+    list_algorithms = []
+
+    if flags.get('heur_new') :                   list_algorithms.append( {'name': 'New Heuristics', 'function': heuristicScheduling, 'batchFunction': heuristicSchedulingBatch} )
+    if flags.get('heur_paparazzi') :             list_algorithms.append( {'name': 'Paparazzi method', 'function': paparazziScheduling} )
+    if flags.get('heur_goossens') :              list_algorithms.append( {'name': 'Goossens\'s Heuristics', 'function': goossensScheduling, 'randomized': True} )
+    if flags.get('heur_goossensModified') :      list_algorithms.append( {'name': 'Modified Goossens\'s Heuristics', 'function': goossensModifiedScheduling, 'randomized': True} )
+    if flags.get('heur_goossensCoupled') :       list_algorithms.append( {'name': 'Coupled Goossens\'s Heuristics', 'function': goossensCoupledScheduling, 'randomized': True} )
+    if flags.get('heur_can') :                   list_algorithms.append( {'name': 'CAN Message Heuristics', 'function': CANScheduling} )
+    if flags.get('optim_cplex_max') :            list_algorithms.append( {'name': 'Optim Max Norm Delay - CPLEX', 'function': optimizeCPLEX_Max, 'optimization': True} )
+    if flags.get('optim_cplex_sum') :            list_algorithms.append( {'name': 'Optim Sum Norm Delay - CPLEX', 'function': optimizeCPLEX_Sum, 'optimization': True} )
+    if flags.get('optim_ortools_cpsat_max') :    list_algorithms.append( {'name': 'Optim Max Norm Delay - OR-Tools CP-SAT', 'function': optimizeORToolsCPSAT_Max, 'optimization': True} )
+    if flags.get('optim_ortools_cpsat_sum') :    list_algorithms.append( {'name': 'Optim Sum Norm Delay - OR-Tools CP-SAT', 'function': optimizeORToolsCPSAT_Sum, 'optimization': True} )
+    if flags.get('optim_ortools_mip_max') :      list_algorithms.append( {'name': 'Optim Max Norm Delay - OR-Tools MIP', 'function': optimizeORToolsMIP_Max, 'optimization': True} )
+    if flags.get('optim_ortools_mip_sum') :      list_algorithms.append( {'name': 'Optim Sum Norm Delay - OR-Tools MIP', 'function': optimizeORToolsMIP_Sum, 'optimization': True} )
+    if flags.get('optim_z3_max') :               list_algorithms.append( {'name': 'Optim Max Norm Delay - Z3', 'function': optimizeZ3_Max, 'optimization': True} )
+    if flags.get('optim_z3_sum') :               list_algorithms.append( {'name': 'Optim Sum Norm Delay - Z3', 'function': optimizeZ3_Sum, 'optimization': True} )
+
+    return tuple( list_algorithms )
+
+
+def runAnalysis(numberSets, numberTasks, U_target, filterSets, list_algorithms, outputFolder = None, resumeFolder = None, sourceFolder = None, cache = None, pool = None):
+    # Generate numberSets sets of numberTasks tasks, calculate their offsets with every algorithm, simulate them and write
+    # the results in outputFolder (named from the parameters and the date if None), or finish the interrupted run
+    # saved in resumeFolder, or make a new run on the task sets of the run saved in sourceFolder (reusing its results).
+    # The simulation cache (SimulationCache) and process pool can be shared by several runs, otherwise they are created
+    # following the flags. Returns a summary dict for each algorithm.
+
+    if resumeFolder != None:
+        # Parameters of the interrupted run
+        with open(resumeFolder + '/parameters.json') as file: parameters = json.load(file)
+        numberSets, numberTasks, U_target, filterSets = parameters['numberSets'], parameters['numberTasks'], parameters['U_target'], parameters['filterSets']
+        runSeed = parameters.get('masterSeed')
+        # Runs saved before the generation flags were in parameters.json keep the flags of the script
+        generation = { flag: parameters.get(flag, globals()[flag]) for flag in generationFlags }
+    elif sourceFolder != None:
+        # Task sets of the previous run, and its parameters if saved (runs made before parameters.json keep the flags)
+        sourceTaskSets, sourceResults = loadRun(sourceFolder)
+        numberSets, numberTasks = len(sourceTaskSets), len(sourceTaskSets[0])
+        parameters = {}
+        if Path(sourceFolder + '/parameters.json').exists():
+            with open(sourceFolder + '/parameters.json') as file: parameters = json.load(file)
+        U_target, filterSets = parameters.get('U_target', U_target), parameters.get('filterSets', filterSets)
+        runSeed = parameters.get('masterSeed', masterSeed)
+        generation = { flag: parameters.get(flag, globals()[flag]) for flag in generationFlags }
+    else:
+        runSeed = masterSeed
+        generation = { flag: globals()[flag] for flag in generationFlags }
+    if runSeed == None: runSeed = np.random.SeedSequence().entropy
 
-    list_offsetAssignments = []
+    print('Considering the following algorithms:')
+    for algorithm in list_algorithms:
+        print(' - ' + algorithm['name'])
+    print()
 
-    n = len(list_taskSets)
-    i = 0
+    if verbose:
+        print(f'Generating {numberSets} sets of {numberTasks} tasks...')
+        print()
+        print('Factor matrix:')
+        for line in getMatrixFromFile(generation['factorMatrixFile']):
+            print(line)
 
-    for taskSet in list_taskSets:
 
-        start = now()
-        offsets = optimAlgorithm(taskSet, timeLimit_Sec=timeLimit)
-        end = now()
-        list_calcTime.append(end - start)
-        list_offsetAssignments.append(tuple(offsets))
-        i += 1
+    # ---------------------------------------------------------------------------------------
+    # Output folder and simulation setup
 
-    return {'calcTimes': tuple(list_calcTime), 'offsets': tuple(list_offsetAssignments)}
+    if resumeFolder != None:
+        outputFolder = resumeFolder
+    else:
+        if outputFolder == None:
+            if filterSets: markAsfiltered = '_f'
+            else: markAsfiltered = ''
+
+            today = datetime.now()
+            outputFolder = outputFolderRoot + markAsfiltered + f'_{numberSets}x{numberTasks}t_U{U_target*100:.0f}_' + today.strftime("%y%m%d_%H%M")
+
+        Path(outputFolder).mkdir(parents=True, exist_ok=False)
+        with open(outputFolder + '/parameters.json', "w") as file:
+            json.dump({'numberSets': numberSets, 'numberTasks': numberTasks, 'U_target': U_target, 'filterSets': filterSets, 'masterSeed': runSeed, **generation}, file)
+
+    taskSetsFileName = f'{outputFolder}/taskSets_{numberSets}x{numberTasks}t.csv'
+    recordsFileName = f'{outputFolder}/records_{numberSets}x{numberTasks}t.jsonl'
+
+    if sourceFolder != None:
+        # The task sets and results of the previous run are copied to the files of the new one, which resumes from them
+        with open(taskSetsFileName, "w") as file:
+            file.write('(T1,c1);(T2,c2);...\n')
+            csv.writer(file, delimiter=';').writerows([ [(task["period"], task["execTime"]) for task in taskSet] for taskSet in sourceTaskSets ])
+        sourceRecords = RecordLog(recordsFileName)
+        if sourceResults != None:
+            for k, name in enumerate(sourceResults.names):
+                for i in range(numberSets):
+                    if sourceResults.hasOffsets[k, i]:
+                        sourceRecords.write(name, i, calcTime = float(sourceResults.calcTimes[k, i]), offsets = sourceResults.offsets[k, i].tolist())
+                    if sourceResults.hasMaxDelays[k, i]:
+                        sourceRecords.write(name, i, maxDelays = sourceResults.maxDelays[k, i].tolist())
+        sourceRecords.close()
+
+    # Task sets and results already saved (none for a new run)
+    list_taskSets = readTaskSets(taskSetsFileName)
+    records = RecordLog(recordsFileName)
+
+    if resumeFolder != None: print(f'Resuming {outputFolder}: {len(list_taskSets)} task sets and {len(records.records)} results found.')
+    if sourceFolder != None: print(f'Task sets of {sourceFolder}: {len(list_taskSets)} task sets and {len(records.records)} results reused.')
+
+    if cache == None and simCache: cache = SimulationCache(folder = simCacheFolder, maxFolderSize = simCacheMaxSize * 2**20)
+    if cache != None:
+        cacheStatsStart = dict(cache.stats)
+        simGetMaxDelays = cache.getMaxDelays
+    else:
+        simGetMaxDelays = getMaxDelays
+
+    generationStats = {}
+
+    if filterSets: printFilterSets = 'filtered '
+    else: printFilterSets = ''
+
+    # Names of the results of each algorithm (the coupled Goossens heuristics give two)
+    list_algorithms = tuple( [ dict(algorithm) for algorithm in list_algorithms ] )
+    for algorithm in list_algorithms:
+        if algorithm['name'] == 'Coupled Goossens\'s Heuristics': algorithm['results'] = ('Goossens\'s Heuristics (C)', 'Modified Goossens\'s Heuristics (C)')
+        else: algorithm['results'] = (algorithm['name'],)
+    functionNameList = tuple( [ name for algorithm in list_algorithms for name in algorithm['results'] ] )
+
+
+    with open(taskSetsFileName, "a") as taskSetsFile:
+        taskSetsWriter = csv.writer(taskSetsFile, delimiter=';')
+        if taskSetsFile.tell() == 0: taskSetsFile.write('(T1,c1);(T2,c2);...\n')
+
+        if streaming:
+            # ---------------------------------------------------------------------------------------
+            # Streaming: each task set is generated, scheduled by every algorithm, simulated and recorded before the next one.
+            # Only counters and a uniform sample of the delay metrics (for the plots) are kept.
+
+            print('Generating, scheduling and simulating ' + printFilterSets + 'task sets...')
+
+            list_results = [ {'name': name, 'totalCalcTime': 0, 'notSchedulable': 0, 'simStats': {},
+                              'samples': tuple( [ Reservoir(streamingSampleSize, seed = m) for m in range(4) ] )} for name in functionNameList ]
+
+            uMin = 1
+            uMax = 0
+            newTaskSets = deque()
+            for i in range(numberSets):
+                if i < len(list_taskSets): taskSet = list_taskSets[i]
+                else:
+                    # Generated by blocks of generationBatchSize sets
+                    blockSize = generation['generationBatchSize']
+                    if not newTaskSets: newTaskSets = deque( generateFilteredTaskSets(generation, numberSets, numberTasks, U_target, filterSets, runSeed,
+                                                                                      start = i, stop = i - i % blockSize + blockSize, stats = generationStats) )
+                    taskSet = newTaskSets.popleft()
+                    taskSetsWriter.writerow([(task["period"], task["execTime"]) for task in taskSet])
+                    taskSetsFile.flush()
+                uMin = min(uMin, taskSet.utilization)
+                uMax = max(uMax, taskSet.utilization)
+
+                # Saved results of this set, completed with the offsets of the algorithms not done yet
+                setRecords = { name: records.pop(name, i) for name in functionNameList }
+                for algorithm in list_algorithms:
+                    if all([ 'offsets' in setRecords[name] for name in algorithm['results'] ]): continue
+                    calcTime, offsets = runOffsetJob( (algorithm['function'], taskSet, getJobArguments(algorithm, runSeed, i)) )
+                    if len(algorithm['results']) == 1: offsets = (offsets,)
+                    for name, resultOffsets in zip(algorithm['results'], offsets):
+                        setRecords[name] = {'calcTime': calcTime, 'offsets': [ int(offset) for offset in resultOffsets ]}
+                        records.write(name, i, **setRecords[name])
+
+                # Maximum delays of the results not simulated yet
+                pending = [ k for k, name in enumerate(functionNameList) if 'maxDelays' not in setRecords[name] ]
+                for k in pending:
+                    maxDelays = [ int(delay) for delay in simGetMaxDelays(taskSet, setRecords[functionNameList[k]]['offsets'], engine = simulationEngine, steadyState = simSteadyState, stats = list_results[k]['simStats']) ]
+                    setRecords[functionNameList[k]]['maxDelays'] = maxDelays
+                    records.write(functionNameList[k], i, maxDelays = maxDelays)
+
+                for result in list_results:
+                    record = setRecords[result['name']]
+                    maxDelays = tuple(record['maxDelays'])
+                    result['totalCalcTime'] += record['calcTime']
+                    if not all([ maxDelays[j] + taskSet.execTimes[j] <= taskSet.periods[j] for j in range(len(taskSet)) ]): result['notSchedulable'] += 1
+                    for sample, values in zip(result['samples'], getDelayMetrics(taskSet, maxDelays)): sample.extend(values)
+
+                print(f'{i+1}/{numberSets}', end='\r', flush=True)
+            print()
+
+            for result in list_results:
+                print(f"Time spent in {result['name']} is: ", result['totalCalcTime'])
+
+            totalCalcTimes = tuple( [ result['totalCalcTime'] for result in list_results ] )
+            notSchedulable = tuple( [ result['notSchedulable'] for result in list_results ] )
+            list_simStats = tuple( [ result['simStats'] for result in list_results ] )
+
+            allMaxDelays, maxDelaysPerPeriod, maxDelaysPerExecTime, maxRespTimeOverC = [ tuple( [ tuple(result['samples'][m].values) for result in list_results ] ) for m in range(4) ]
+            meanDelayMetrics = [ [ result['samples'][m].mean for m in range(4) ] for result in list_results ]
+
+
+        else:
+            # ---------------------------------------------------------------------------------------
+            # Generate a list of Tasks Sets:
+
+            print('Generating ' + printFilterSets + 'task sets...')
+
+            newTaskSets = generateFilteredTaskSets(generation, numberSets, numberTasks, U_target, filterSets, runSeed, start = len(list_taskSets), stats = generationStats)
+            for taskSet in newTaskSets:
+                taskSetsWriter.writerow([(task["period"], task["execTime"]) for task in taskSet])
+            taskSetsFile.flush()
+            list_taskSets = tuple( (list_taskSets + newTaskSets)[:numberSets] )
+            uMin = 1
+            uMax = 0
+            for taskSet in list_taskSets:
+                currentU = taskSet.utilization
+                if currentU < uMin: uMin = currentU
+                if currentU > uMax: uMax = currentU
+            print()
+
+
+            # ---------------------------------------------------------------------------------------
+            # Calculate offsets:
+
+            results = ResultStore(functionNameList, list_taskSets)
+
+            # Saved results
+            for k, name in enumerate(functionNameList):
+                for i in range(numberSets):
+                    record = records.pop(name, i)
+                    if 'offsets' in record:
+                        results.calcTimes[k, i], results.offsets[k, i], results.hasOffsets[k, i] = record['calcTime'], record['offsets'], True
+                    if 'maxDelays' in record:
+                        results.maxDelays[k, i], results.hasMaxDelays[k, i] = record['maxDelays'], True
+
+            offsetPool = pool if pool != None else createPool(numberWorkers)
+
+            for algorithm in list_algorithms:
+                ks = [ functionNameList.index(name) for name in algorithm['results'] ]
+                pending = [ i for i in range(numberSets) if not results.hasOffsets[ks, i].all() ]
+
+                if 'batchFunction' in algorithm:
+                    outputs = runBatchOffsetJobs(algorithm['batchFunction'], [ list_taskSets[i] for i in pending ], offsetPool, batchChunkSize, numberWorkers)
+                else:
+                    outputs = runOffsetJobs([ (algorithm['function'], list_taskSets[i], getJobArguments(algorithm, runSeed, i)) for i in pending ], offsetPool)
+                for i, (calcTime, offsets) in zip(pending, outputs):
+                    if len(ks) == 1: offsets = (offsets,)
+                    for k, resultOffsets in zip(ks, offsets):
+                        results.calcTimes[k, i], results.offsets[k, i] = calcTime, resultOffsets
+                        results.hasOffsets[k, i], results.hasMaxDelays[k, i] = True, False
+                        records.write(functionNameList[k], i, calcTime = calcTime, offsets = results.offsets[k, i].tolist())
+
+                print(f"Time spent in {algorithm['name']} is: ", results.calcTimes[ks[0]].sum())
+
+
+            # ---------------------------------------------------------------------------------------
+            # Get maximum delays from simulation
+
+            print('Simulating...')
+
+            if offsetPool != None:
+                # Simulate chunks of (task set, algorithm) pairs in the worker processes, recording the results by blocks of chunks
+                pairs = [ (i, k) for i in range(numberSets) for k in range(len(functionNameList)) if not results.hasMaxDelays[k, i] ]
+                blockSize = 4 * numberWorkers * simChunkSize
+                for start in range(0, len(pairs), blockSize):
+                    blockPairs = pairs[start:start + blockSize]
+                    pairResults = simulatePairs([ list_taskSets[i] for i, k in blockPairs ], [ results.offsets[k, i].tolist() for i, k in blockPairs ],
+                                                engine = simulationEngine, steadyState = simSteadyState, pool = offsetPool, chunkSize = simChunkSize,
+                                                cache = cache)
+                    for (i, k), maxDelays, schedulable, events in zip(blockPairs, *pairResults):
+                        results.maxDelays[k, i], results.hasMaxDelays[k, i] = maxDelays, True
+                        records.write(functionNameList[k], i, maxDelays = list(maxDelays))
+                        results.simStats[k]['events'] = results.simStats[k].get('events', 0) + events
+                if pool == None: offsetPool.close()
+
+            else:
+                for k in range(len(functionNameList)):
+                    for i, taskSet in enumerate(list_taskSets):
+                        if results.hasMaxDelays[k, i]: continue
+                        results.maxDelays[k, i] = simGetMaxDelays(taskSet, results.offsets[k, i].tolist(), engine = simulationEngine, steadyState = simSteadyState, stats = results.simStats[k] )
+                        results.hasMaxDelays[k, i] = True
+                        records.write(functionNameList[k], i, maxDelays = results.maxDelays[k, i].tolist())
+
+
+            results.save(f'{outputFolder}/results_{numberSets}x{numberTasks}t.npz')
+
+            totalCalcTimes = results.totalCalcTimes()
+            notSchedulable = results.notSchedulable()
+            list_simStats = results.simStats
+
+            # One row per algorithm (boxplot takes the columns of a 2D array as its data sets)
+            allMaxDelays, maxDelaysPerPeriod, maxDelaysPerExecTime, maxRespTimeOverC = [ list(metric) for metric in results.delayMetrics() ]
+            meanDelayMetrics = [ [ float(metric.mean()) for metric in row ] for row in zip(allMaxDelays, maxDelaysPerPeriod, maxDelaysPerExecTime, maxRespTimeOverC) ]
+
+    records.close()
+
+
+    # Plot in boxplot
+    plotFileName = f'{outputFolder}/plot_{numberSets}x{numberTasks}t'
+
+    printBoxplot4(functionNameList, allMaxDelays, maxDelaysPerPeriod, maxDelaysPerExecTime, maxRespTimeOverC, plotFileName, showOutliers=False)
+    printBoxplot4(functionNameList, allMaxDelays, maxDelaysPerPeriod, maxDelaysPerExecTime, maxRespTimeOverC, plotFileName+"_outliers", showOutliers=True)
+
+
+    # Write log in txt file
+    with open(outputFolder + '/log.txt', "w+") as file:
+        file.write(f'{numberSets} sets of {numberTasks} tasks. U = {U_target:.2f} ({uMin:.2f} - {uMax:.2f}).\n')
+        file.write(f'Master seed: {runSeed}\n\n')
+        for k, name in enumerate(functionNameList):
+            file.write( f'Time spent in {name}: {totalCalcTimes[k]:.2e} -- Not schedulable: {notSchedulable[k]}\n' )
+        if generationStats.get('acceptedSets'):
+            drawnSets, acceptedSets = generationStats['drawnSets'], generationStats['acceptedSets']
+            file.write(f'\nGenerated task sets: {acceptedSets} accepted out of {drawnSets} drawn ({100*acceptedSets/drawnSets:.2f}% -- {drawnSets/acceptedSets:.1f} draws per set)\n')
+            if 'droppedShare' in generationStats: file.write(f'Direct sampling: common factors left out hold {100*generationStats["droppedShare"]:.2f}% of the filtered sets\n')
+            if 'pilotDrawnSets' in generationStats:
+                pilotDrawnSets = generationStats['pilotDrawnSets']
+                file.write(f'Direct sampling: {pilotDrawnSets} sets drawn by the pilot ({(drawnSets + pilotDrawnSets)/acceptedSets:.1f} draws per set with them)\n')
+        file.write(f'\nSimulation engine: {simulationEngine}\n')
+        for name, simStats in zip(functionNameList, list_simStats):
+            file.write( f'Simulated jobs in {name}: {simStats.get("events", 0)}\n' )
+        if cache != None:
+            cacheStats = { key: cache.stats[key] - cacheStatsStart[key] for key in cache.stats }
+            lookups = cacheStats['hits'] + cacheStats['diskHits'] + cacheStats['misses']
+            file.write( f'Simulation cache: {cacheStats["hits"]} hits -- {cacheStats["diskHits"]} disk hits -- {cacheStats["misses"]} misses ({100*(lookups - cacheStats["misses"])/max(1, lookups):.1f}% hit rate)\n' )
+
+    print(f'Done.\nResults in TXT, CSV, PNG and PDF files with name root = {plotFileName}')
+
+    return [ {'numberSets': numberSets, 'numberTasks': numberTasks, 'U_target': U_target, 'filterSets': filterSets, 'uMin': uMin, 'uMax': uMax,
+              'algorithm': name, 'calcTime': float(totalCalcTimes[k]), 'notSchedulable': int(notSchedulable[k]),
+              'meanMaxDelay': meanDelayMetrics[k][0], 'meanMaxDelayPerPeriod': meanDelayMetrics[k][1],
+              'meanMaxDelayPerExecTime': meanDelayMetrics[k][2], 'meanMaxRespTimeOverC': meanDelayMetrics[k][3],
+              'outputFolder': outputFolder} for k, name in enumerate(functionNameList) ]
 
 
 
@@ -147,183 +489,20 @@ def evalOptimAlgo(optimAlgorithm, list_taskSets, timeLimit=None):
 
 # To generate a factor matrix: probabilityFromXml.py
 
-list_algorithms = []
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description = 'Compare offset assignment algorithms on random task sets')
+    parser.add_argument('--resume', metavar = 'folder', help = 'output folder of an interrupted run, to finish it: its task sets are reloaded and only the missing (algorithm, set) results are calculated')
+    parser.add_argument('--taskSets', metavar = 'folder', help = 'output folder of a previous run: a new run is made on the same task sets, reusing the results of the algorithms it already has')
+    arguments = parser.parse_args()
+    if arguments.resume != None and arguments.taskSets != None: parser.error('--resume and --taskSets cannot be used together')
 
-print('EVALUATION OF FIFO OFFSET ASSIGNMENT ALGORITHMS')
-print('-----------------------------------------------')
-print()
-
-print('Considering the following algorithms:')
-
-if heur_new :                   list_algorithms.append( {'name': 'New Heuristics', 'function': heuristicScheduling} )
-if heur_paparazzi :             list_algorithms.append( {'name': 'Paparazzi method', 'function': paparazziScheduling} )
-if heur_goossens :              list_algorithms.append( {'name': 'Goossens\'s Heuristics', 'function': goossensScheduling} )
-if heur_goossensModified :      list_algorithms.append( {'name': 'Modified Goossens\'s Heuristics', 'function': goossensModifiedScheduling} )    
-if heur_goossensCoupled :       list_algorithms.append( {'name': 'Coupled Goossens\'s Heuristics', 'function': goossensCoupledScheduling} )    
-if heur_can :                   list_algorithms.append( {'name': 'CAN Message Heuristics', 'function': CANScheduling} )    
-if optim_cplex_max :            list_algorithms.append( {'name': 'Optim Max Norm Delay - CPLEX', 'function': optimizeCPLEX_Max, 'optimization': True} )  
-if optim_cplex_sum :            list_algorithms.append( {'name': 'Optim Sum Norm Delay - CPLEX', 'function': optimizeCPLEX_Sum, 'optimization': True} )      
-if optim_ortools_cpsat_max :    list_algorithms.append( {'name': 'Optim Max Norm Delay - OR-Tools CP-SAT', 'function': optimizeORToolsCPSAT_Max, 'optimization': True} )   
-if optim_ortools_cpsat_sum :    list_algorithms.append( {'name': 'Optim Sum Norm Delay - OR-Tools CP-SAT', 'function': optimizeORToolsCPSAT_Sum, 'optimization': True} )  
-if optim_ortools_mip_max :      list_algorithms.append( {'name': 'Optim Max Norm Delay - OR-Tools MIP', 'function': optimizeORToolsMIP_Max, 'optimization': True} )   
-if optim_ortools_mip_sum :      list_algorithms.append( {'name': 'Optim Sum Norm Delay - OR-Tools MIP', 'function': optimizeORToolsMIP_Sum, 'optimization': True} )  
-if optim_z3_max :               list_algorithms.append( {'name': 'Optim Max Norm Delay - Z3', 'function': optimizeZ3_Max, 'optimization': True} )          
-if optim_z3_sum :               list_algorithms.append( {'name': 'Optim Sum Norm Delay - Z3', 'function': optimizeZ3_Sum, 'optimization': True} )    
-
-list_algorithms = tuple( list_algorithms )
-
-for algorithm in list_algorithms:
-    print(' - ' + algorithm['name'])
-
-print()
-
-if verbose:
-    print(f'Generating {numberSets} sets of {numberTasks} tasks...')
+    print('EVALUATION OF FIFO OFFSET ASSIGNMENT ALGORITHMS')
+    print('-----------------------------------------------')
     print()
-    print('Factor matrix:')
-    for line in getMatrixFromFile(factorMatrixFile):
-        print(line)
-
-
-# ---------------------------------------------------------------------------------------
-# Generate a list of Tasks Sets:
-
-if filterSets: printFilterSets = 'filtered '
-else: printFilterSets = ''
-print('Generating ' + printFilterSets + 'task sets...')
-
-list_taskSets = []
-for i in range(numberSets):
-    if filterSets:
-        gcdPeriods = 1
-        maxExecTime = 1
-        while maxExecTime >= gcdPeriods:
-            newTaskSet = generateTaskSetDRS(factorMatrixFile, numberTasks, U = U_target)
-            gcdPeriods = reduce(gcd, [task['period'] for task in newTaskSet] )
-            maxExecTime = max([task['execTime'] for task in newTaskSet])
-    else:
-        newTaskSet = generateTaskSetDRS(factorMatrixFile, numberTasks, U = U_target)
-    list_taskSets.append( newTaskSet )
-    print(f'{i+1}/{numberSets}', end='\r', flush=True)
-list_taskSets = tuple(list_taskSets)
-uMin = 1
-uMax = 0
-for taskSet in list_taskSets:
-    currentU = 0
-    for task in taskSet:
-        currentU += task['execTime']/task['period']
-    if currentU < uMin: uMin = currentU
-    if currentU > uMax: uMax = currentU
-print()
-
-if filterSets: markAsfiltered = '_f'
-else: markAsfiltered = ''
-
-today = datetime.now()
-outputFolder = outputFolderRoot + markAsfiltered + f'_{numberSets}x{numberTasks}t_U{U_target*100:.0f}_' + today.strftime("%y%m%d_%H%M")
-
-taskSetsFileName = f'{outputFolder}/taskSets_{numberSets}x{numberTasks}t.csv'
-
-Path(outputFolder).mkdir(parents=True, exist_ok=False)
-with open(taskSetsFileName, "w") as file:
-    writer = csv.writer(file, delimiter=';')
-    file.write('(T1,c1);(T2,c2);...\n')
-    for taskSet in list_taskSets:
-        writer.writerow([(task["period"], task["execTime"]) for task in taskSet])
-
-
-# ---------------------------------------------------------------------------------------
-# Calculate offsets:
-
-list_results = []
-
-for algorithm in list_algorithms:
-
-    if algorithm['name'] == 'Coupled Goossens\'s Heuristics':
-
-        result_orig = {'name': 'Goossens\'s Heuristics (C)'}
-        result_orig['taskSets'] = tuple( [ {'tasks': x} for x in list_taskSets] )
-
-        result_mod = {'name': 'Modified Goossens\'s Heuristics (C)'}
-        result_mod['taskSets'] = tuple( [ {'tasks': x} for x in list_taskSets] )
-        
-        coupledResult = evalCoupledSchedHeur(algorithm['function'], list_taskSets)
-
-        for i, taskSet in enumerate(result_orig['taskSets']):
-            taskSet['calcTime'] = coupledResult[0]['calcTimes'][i]
-            for j, task in enumerate(taskSet['tasks']):
-                task['offset'] = coupledResult[0]['offsets'][i][j]
-
-        for i, taskSet in enumerate(result_mod['taskSets']):
-            taskSet['calcTime'] = coupledResult[1]['calcTimes'][i]
-            for j, task in enumerate(taskSet['tasks']):
-                task['offset'] = coupledResult[1]['offsets'][i][j]
-        
-        list_results.append( deepcopy(result_orig) )
-        list_results.append( deepcopy(result_mod) )
-
-        print(f"Time spent in {algorithm['name']} is: ", sum(coupledResult[0]['calcTimes']))
-
-    else:
-        result = {}
-        result['name'] = algorithm['name']
-        result['taskSets'] = tuple( [ {'tasks': x} for x in list_taskSets] )
-
-        if algorithm.get('optimization'): output = evalOptimAlgo(algorithm['function'], list_taskSets, timeLimit=optimTimeLimit)
-        else: output = evalSchedHeur(algorithm['function'], list_taskSets)
-
-        for i, taskSet in enumerate(result['taskSets']):
-            taskSet['calcTime'] = output['calcTimes'][i]
-            for j, task in enumerate(taskSet['tasks']):
-                task['offset'] = output['offsets'][i][j]
-
-        list_results.append( deepcopy(result) )
-        print(f"Time spent in {algorithm['name']} is: ", sum(output['calcTimes']))
-
-
-# ---------------------------------------------------------------------------------------
-# Get maximum delays from simulation
-
-print('Simulating...')
-
-for result in list_results:
-    notSchedulable = 0
-    for i, taskSet in enumerate(result['taskSets']):
-        schedulable = True
-        maxDelays = getMaxDelaysFromSim(taskSet['tasks'], [ task['offset'] for task in taskSet['tasks'] ] )
-        for j, task in enumerate(taskSet['tasks']):
-            task['maxDelay'] = maxDelays[j]
-            if task['maxDelay'] + task['execTime'] > task['period']: schedulable = False
-        if not schedulable: notSchedulable += 1
-    result['notSchedulable'] = notSchedulable
-
-
-functionNameList = tuple([result['name'] for result in list_results])
-
-allMaxDelays = tuple( [ tuple( [task['maxDelay'] for taskSet in result['taskSets'] for task in taskSet['tasks']] ) for result in list_results ] )
-
-maxDelaysPerPeriod = tuple( [ tuple( [task['maxDelay']/task['period'] for taskSet in result['taskSets'] for task in taskSet['tasks']] ) for result in list_results ] )
-
-maxDelaysPerExecTime = tuple( [ tuple( [
-    task['maxDelay']/nlargest(2, [ t['execTime'] for t in taskSet['tasks'] ])[1 if (task['execTime'] == max([ t['execTime'] for t in taskSet['tasks'] ])) else 0]
-    for taskSet in result['taskSets'] for task in taskSet['tasks']] ) for result in list_results ] )
-
-maxRespTimeOverC = tuple( [ tuple( [
-    (task['maxDelay'] + task['execTime'])/task['execTime']
-    for taskSet in result['taskSets'] for task in taskSet['tasks']] ) for result in list_results ] )
-
-
-# Plot in boxplot
-plotFileName = f'{outputFolder}/plot_{numberSets}x{numberTasks}t'
-
-printBoxplot4(functionNameList, allMaxDelays, maxDelaysPerPeriod, maxDelaysPerExecTime, maxRespTimeOverC, plotFileName, showOutliers=False)
-printBoxplot4(functionNameList, allMaxDelays, maxDelaysPerPeriod, maxDelaysPerExecTime, maxRespTimeOverC, plotFileName+"_outliers", showOutliers=True)
-
 
-# Write log in txt file
-with open(outputFolder + '/log.txt', "w+") as file:
-    file.write(f'{numberSets} sets of {numberTasks} tasks. U = {U_target:.2f} ({uMin:.2f} - {uMax:.2f}).\n\n')
-    for result in list_results:
-        file.write( f'Time spent in {result["name"]}: {sum([x["calcTime"] for x in result["taskSets"]]):.2e} -- Not schedulable: {result["notSchedulable"]}\n' )
+    algorithmFlags = {'heur_new': heur_new, 'heur_paparazzi': heur_paparazzi, 'heur_goossens': heur_goossens, 'heur_goossensModified': heur_goossensModified,
+                      'heur_goossensCoupled': heur_goossensCoupled, 'heur_can': heur_can, 'optim_cplex_max': optim_cplex_max, 'optim_cplex_sum': optim_cplex_sum,
+                      'optim_ortools_cpsat_max': optim_ortools_cpsat_max, 'optim_ortools_cpsat_sum': optim_ortools_cpsat_sum,
+                      'optim_ortools_mip_max': optim_ortools_mip_max, 'optim_ortools_mip_sum': optim_ortools_mip_sum, 'optim_z3_max': optim_z3_max, 'optim_z3_sum': optim_z3_sum}
 
-print(f'Done.\nResults in TXT, CSV, PNG and PDF files with name root = {plotFileName}')
\ No newline at end of file
+    runAnalysis(numberSets, numberTasks, U_target, filterSets, getAlgorithms(algorithmFlags), resumeFolder = arguments.resume, sourceFolder = arguments.taskSets)
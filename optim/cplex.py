@@ -18,6 +18,7 @@ parentdir = os.path.dirname(currentdir)
 sys.path.append(parentdir)
 
 from basicFunctions.toImport import *
+from basicFunctions.taskSet import taskPeriods, taskExecTimes
 from docplex.cp.model import CpoModel
 
 
@@ -36,8 +37,8 @@ def optimizeCPLEX(taskSet, maxOverlap = False, timeLimit_Sec = None, verbose = F
 
     n = len(taskSet)
 
-    periods = tuple( [ int(round(task['period'] )) for task in taskSet ] )
-    c = tuple( [ task['execTime'] for task in taskSet ] )
+    periods = tuple( [ int(round(period)) for period in taskPeriods(taskSet) ] )
+    c = tuple( taskExecTimes(taskSet) )
 
     gcds = tuple( [ tuple( [gcd(periods[i], periods[j]) for j in range(n)] ) for i in range(n)] )
 
@@ -19,6 +19,7 @@ sys.path.append(parentdir)
 
 from z3 import *
 from basicFunctions.toImport import *
+from basicFunctions.taskSet import taskPeriods, taskExecTimes
 from time import time as now
 
 
@@ -37,8 +38,8 @@ def optimizeZ3(taskSet, maxOverlap = False, timeLimit_Sec = None, verbose = Fals
 
     n = len(taskSet)
 
-    periods = tuple( [ int(round(task['period'] )) for task in taskSet ] )
-    c = tuple( [ task['execTime'] for task in taskSet ] )
+    periods = tuple( [ int(round(period)) for period in taskPeriods(taskSet) ] )
+    c = tuple( taskExecTimes(taskSet) )
 
     gcds = tuple( [ tuple( [gcd(periods[i], periods[j]) for j in range(n)] ) for i in range(n)] )
 
@@ -5,24 +5,27 @@
 # 
 # Grenier, Mathieu, Lionel Havet, and Nicolas Navet. "Pushing the limits of CAN-scheduling frames with offsets provides a major performance boost." 4th European Congress on Embedded Real Time Software (ERTS 2008). 2008.
 
+import numpy as np
 
-def CANScheduling(list_tasks, verbose=False):
+from basicFunctions.taskSet import taskPeriods
 
-    list_periods = tuple( [ int(task['period']) for task in list_tasks ] )
 
-    calls = []
-    assignedOffsets = []
-    assignedTasks = []
+def CANScheduling(list_tasks, verbose=False):
+
+    list_periods = tuple( taskPeriods(list_tasks) )
 
     maxPeriod = max(list_periods)
 
-    for task in list_tasks:
-        taskPeriod = task['period']
-        calls = reduceIfFull(calls, maxPeriod)
-        newOffset = middleOfLargestInterval(calls, maxPeriod) % taskPeriod
+    # Number of calls of the tasks already assigned at each time of [0, maxPeriod), number of times without any, and
+    # sorted times with at least one call
+    occupancy = {'calls': np.zeros(maxPeriod, dtype=np.int64), 'emptySlots': maxPeriod, 'times': np.zeros(0, dtype=np.int64)}
+    assignedOffsets = []
+
+    for taskPeriod in list_periods:
+        reduceIfFull(occupancy)
+        newOffset = middleOfLargestInterval(occupancy['times'], maxPeriod) % taskPeriod
         assignedOffsets.append(newOffset)
-        assignedTasks.append(task)
-        calls = addToCalls(calls, newOffset, taskPeriod, maxPeriod)
+        addToCalls(occupancy, newOffset, taskPeriod)
 
     return tuple(assignedOffsets)
 
@@ -30,41 +33,42 @@ def CANScheduling(list_tasks, verbose=False):
 # ----------------------
 # Auxiliary functions
 
-def reduceIfFull(listCalls, maximum):
-    full = True
-    i = 0
-    for i in range(maximum):
-        if not (i in listCalls) :
-            full = False
-            break
-    if full:
-        for i in range(maximum): listCalls.remove(i)
-        return reduceIfFull(listCalls, maximum)
-    return listCalls
-
-
-def middleOfLargestInterval(listCalls, maxTime):
-    if len(listCalls) == 0: return (maxTime -1)//2
-    if listCalls[0] == 0: position = 0
-    else: position = (listCalls[0] - 1) // 2
-    maxInterval = listCalls[0]
-
-    for i in range(len(listCalls)-1):
-        delta = listCalls[i+1] - listCalls[i]
-        if delta > maxInterval:
-            maxInterval = delta
-            position = listCalls[i] + delta//2    # Add 0 if delta = 1 or 2; add 1 if biggestInterval_length = 3 or 4; ...
-    delta = maxTime - 1 - listCalls[-1]
-
-    if delta > maxInterval: return listCalls[-1] + (delta - 1)//2
+def reduceIfFull(occupancy):
+    # While every time has a call, remove one call at each time
+    calls = occupancy['calls']
+    if occupancy['emptySlots'] == 0:
+        calls -= calls.min()
+        occupancy['times'] = np.flatnonzero(calls)
+        occupancy['emptySlots'] = len(calls) - len(occupancy['times'])
+
+
+def middleOfLargestInterval(times, maxTime):
+    # Middle of the largest interval without calls (the first one among the largest), given the sorted times of calls
+    if len(times) == 0: return (maxTime -1)//2
+    first = int(times[0])
+    if first == 0: position = 0
+    else: position = (first - 1) // 2
+    maxInterval = first
+
+    if len(times) > 1:
+        deltas = np.diff(times)
+        i = int(deltas.argmax())
+        if deltas[i] > maxInterval:
+            maxInterval = int(deltas[i])
+            position = int(times[i]) + maxInterval//2    # Add 0 if delta = 1 or 2; add 1 if biggestInterval_length = 3 or 4; ...
+    last = int(times[-1])
+    delta = maxTime - 1 - last
+
+    if delta > maxInterval: return last + (delta - 1)//2
     else: return position
 
 
-def addToCalls(calls, offset, period, maximum):
+def addToCalls(occupancy, offset, period):
+    # One more call at offset + k * period for every k
     offset = offset % period
-    i = offset
-    while i < maximum:
-        calls.append(i)
-        i += period
-    calls.sort()
-    return calls
+    taskCalls = occupancy['calls'][offset::period]
+    newTimes = np.arange(offset, len(occupancy['calls']), period)[taskCalls == 0]
+    occupancy['emptySlots'] -= len(newTimes)
+    taskCalls += 1
+    times = occupancy['times']
+    occupancy['times'] = np.insert(times, np.searchsorted(times, newTimes), newTimes)
@@ -10,16 +10,18 @@
 # Import
 
 from math import gcd
-from random import randint
+import random
+from basicFunctions.taskSet import taskPeriods, taskExecTimes
 
 # -----------------------------------------------------------
 # Goossens offset assignment heuristics
+# The offsets of the tasks without a pair are drawn with rng (the random module by default, or a seeded random.Random)
 
-def goossensScheduling(list_tasks, verbose=False):
+def goossensScheduling(list_tasks, verbose=False, rng=random):
     
     n = len(list_tasks)
 
-    list_periods = tuple( [ int(task['period']) for task in list_tasks ] )
+    list_periods = tuple( taskPeriods(list_tasks) )
 
     G = []
     for i in range(n):
@@ -38,7 +40,7 @@ def goossensScheduling(list_tasks, verbose=False):
         Gs_k_col = Gs[k][1]
         Gs_k_gcd = Gs[k][2]
         if (not mark[Gs_k_col]) and (not mark[Gs_k_row]):
-            offsets[Gs_k_row] = randint(0,list_periods[Gs_k_row]-1)
+            offsets[Gs_k_row] = rng.randint(0,list_periods[Gs_k_row]-1)
             offsets[Gs_k_col] = offsets[Gs_k_row] + Gs_k_gcd//2
             assignment = assignment -2
             mark[Gs_k_row] = True
@@ -65,12 +67,12 @@ def goossensScheduling(list_tasks, verbose=False):
 # -----------------------------------------------------------
 # Modified Goossens offset assignment heuristics 
 
-def goossensModifiedScheduling(list_tasks, verbose=False):
+def goossensModifiedScheduling(list_tasks, verbose=False, rng=random):
     
     n = len(list_tasks)
 
-    list_periods = tuple( [ int(task['period']) for task in list_tasks ] )
-    list_execTimes = tuple( [ int(task['execTime']) for task in list_tasks ] )
+    list_periods = tuple( taskPeriods(list_tasks) )
+    list_execTimes = tuple( taskExecTimes(list_tasks) )
 
     G = []
     for i in range(n):
@@ -89,7 +91,7 @@ def goossensModifiedScheduling(list_tasks, verbose=False):
         Gs_k_col = Gs[k][1]
         Gs_k_gcd = Gs[k][2]
         if (not mark[Gs_k_col]) and (not mark[Gs_k_row]):
-            offsets[Gs_k_row] = randint(0,list_periods[Gs_k_row]-1)
+            offsets[Gs_k_row] = rng.randint(0,list_periods[Gs_k_row]-1)
             offsets[Gs_k_col] = offsets[Gs_k_row] + (Gs_k_gcd + list_execTimes[Gs_k_row] - list_execTimes[Gs_k_col])//2
             assignment = assignment -2
             mark[Gs_k_row] = True
@@ -117,11 +119,11 @@ def goossensModifiedScheduling(list_tasks, verbose=False):
 # -----------------------------------------------------------
 # Couple original and modified Goossens offset assignment heuristics 
 
-def goossensCoupledScheduling(list_tasks, verbose=False):
+def goossensCoupledScheduling(list_tasks, verbose=False, rng=random):
     n = len(list_tasks)
 
-    list_periods = tuple( [ int(task['period']) for task in list_tasks ] )
-    list_execTimes = tuple( [ int(task['execTime']) for task in list_tasks ] )
+    list_periods = tuple( taskPeriods(list_tasks) )
+    list_execTimes = tuple( taskExecTimes(list_tasks) )
 
     G = []
     for i in range(n):
@@ -141,7 +143,7 @@ def goossensCoupledScheduling(list_tasks, verbose=False):
         Gs_k_col = Gs[k][1]
         Gs_k_gcd = Gs[k][2]
         if (not mark[Gs_k_col]) and (not mark[Gs_k_row]):
-            offsets_orig[Gs_k_row] = randint(0,list_periods[Gs_k_row]-1)
+            offsets_orig[Gs_k_row] = rng.randint(0,list_periods[Gs_k_row]-1)
             offsets_mod[Gs_k_row] = offsets_orig[Gs_k_row]
             offsets_orig[Gs_k_col] = offsets_orig[Gs_k_row] + Gs_k_gcd//2
             offsets_mod[Gs_k_col] = offsets_mod[Gs_k_row] + (Gs_k_gcd + list_execTimes[Gs_k_row] - list_execTimes[Gs_k_col])//2
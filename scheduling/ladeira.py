@@ -21,26 +21,91 @@
 
 from basicFunctions.toImport import *
 from time import time as now
+import numpy as np
+from basicFunctions.taskSet import taskPeriods, taskExecTimes
+
+
+def sectionBusyTimes(busyClasses, taskSubperiod):
+    # Busy times of a section at the subperiod offsets 0, 1, ... of a task of subperiod Ts, from the busy times of the
+    # tasks assigned to it by residue class ({Tsi: {Ohi: largest Oai + Ci}}): at each offset, the largest busy time of
+    # the classes with Ohi congruent in mod GCD(Tsi, Ts). They repeat with the LCM of these GCDs (a divisor of Ts), so
+    # the array only covers one such period: its smallest value, and the first index of it, are the same as over Ts.
+    busyByResidue = {}
+    for Tsi, busyByOffset in busyClasses.items():
+        gcdBetweenTasks = gcd(Tsi, taskSubperiod)
+        for Ohi, tBusy in busyByOffset.items():
+            residue = (gcdBetweenTasks, Ohi % gcdBetweenTasks)
+            if busyByResidue.get(residue, 0) < tBusy: busyByResidue[residue] = tBusy
+
+    busyTimes = np.zeros(reduce(lcm, set([ gcdBetweenTasks for gcdBetweenTasks, _ in busyByResidue ]), 1), dtype=np.int64)
+    for (gcdBetweenTasks, osiModGCD), tBusy in busyByResidue.items():
+        congruentBusyTimes = busyTimes[osiModGCD::gcdBetweenTasks]
+        np.maximum(congruentBusyTimes, tBusy, out=congruentBusyTimes)
+    return busyTimes
 
 
 def heuristicScheduling(listTasks, verbose = False):
 
     n = len(listTasks)
 
-    list_periods = tuple( [ int(task['period']) for task in listTasks ] )
-    list_execTimes = tuple( [ int(task['execTime']) for task in listTasks ] )
+    list_periods = tuple( taskPeriods(listTasks) )
+    list_execTimes = tuple( taskExecTimes(listTasks) )
 
     overallGCD = reduce(gcd, list_periods)
     
     subperiods = tuple( [ int(period // overallGCD) for period in list_periods ] )
 
+    # Order as: increasing subperiod, decreasing execution time / length
+    order = sorted(range(n), key=lambda i: (subperiods[i], -list_execTimes[i], i))
+
+    return assignOffsets(list_execTimes, subperiods, [ primeFactors(subperiod) for subperiod in subperiods ], order, overallGCD, verbose)
+
+
+def heuristicSchedulingBatch(taskSets, verbose = False):
+    # heuristicScheduling for a list of task sets with the same number of tasks n. The GCDs, subperiods and task orders
+    # are calculated for all the sets at once, and each distinct subperiod is factored once.
+    # Returns the nSets x n integer array of offsets, and the calculation time of each set (seconds): its own offset
+    # assignment, plus an equal share of the common calculations.
+
+    start = now()
+    nSets = len(taskSets)
+    if nSets == 0: return np.zeros((0, 0), dtype=np.int64), np.zeros(0)
+    list_periods = np.array([ taskPeriods(taskSet) for taskSet in taskSets ], dtype=np.int64)
+    list_execTimes = np.array([ taskExecTimes(taskSet) for taskSet in taskSets ], dtype=np.int64)
+    n = list_periods.shape[1]
+
+    overallGCDs = np.gcd.reduce(list_periods, axis=1)
+    subperiods = list_periods // overallGCDs[:, None]
+
+    # Order as: increasing subperiod, decreasing execution time / length (the last key of lexsort is the first one)
+    orders = np.lexsort( (np.broadcast_to(np.arange(n), subperiods.shape), -list_execTimes, subperiods) )
+
+    distinctSubperiods, subperiodIndexes = np.unique(subperiods, return_inverse=True)
+    distinctPrimes = [ primeFactors(subperiod) for subperiod in distinctSubperiods.tolist() ]
+    subperiodIndexes = subperiodIndexes.reshape(subperiods.shape)
+
+    offsets = np.zeros((nSets, n), dtype=np.int64)
+    calcTimes = np.full(nSets, (now() - start) / max(nSets, 1))
+    for s in range(nSets):
+        start = now()
+        offsets[s] = assignOffsets(list_execTimes[s].tolist(), subperiods[s].tolist(), [ distinctPrimes[j] for j in subperiodIndexes[s].tolist() ],
+                                   orders[s].tolist(), int(overallGCDs[s]), verbose)
+        calcTimes[s] += now() - start
+
+    return offsets, calcTimes
+
+
+def assignOffsets(list_execTimes, subperiods, list_primes, order, overallGCD, verbose = False):
+    # Offsets of heuristicScheduling, from the execution times, the subperiods (periods / overallGCD) and their prime
+    # factors, with the tasks taken in order (indexes by increasing subperiod, decreasing execution time)
+
+    n = len(list_execTimes)
+
     # -----------------------------------------------------------
     # Offset calculation
 
     # Create vector/tuple with task information: i, c, Ts, primes, 
-    # Order as: increasing subperiod, decreasing execution time / length
-    reorderedTasks = [(i, list_execTimes[i], subperiods[i], primeFactors(subperiods[i])) for i in range(n)]
-    reorderedTasks = sorted(reorderedTasks, key=lambda task: (task[2], -task[1], task[0]), reverse=False)
+    reorderedTasks = [(i, list_execTimes[i], subperiods[i], list_primes[i]) for i in order]
 
     # Result vector: [Oh, Og, Oa, sum]
     offsets = [[] for _ in range(n)]
@@ -54,6 +119,10 @@ def heuristicScheduling(listTasks, verbose = False):
 
     sectionSizes = [0] * len(primeSections)
     assignedTasks = [[] for _ in primeSections]
+    # Busy times of the tasks assigned to each section by residue class ({Tsi: {Ohi: largest Oai + Ci}}), and the
+    # busy times of each section for the last subperiod evaluated ((Ts, array) or None), updated as tasks are assigned
+    sectionBusyClasses = [{} for _ in primeSections]
+    sectionBusyCache = [None] * len(primeSections)
 
     # For every task inside the task list:
     for task in reorderedTasks:
@@ -64,8 +133,8 @@ def heuristicScheduling(listTasks, verbose = False):
         number_taskPrimes = len(taskPrimes)
         # print(f'Assigning offset to task {taskIndex}: ({taskExecutionTime}, {taskSubperiod}). Primes: {taskPrimes}')
 
-        # Create #nPrimes vectors of size Ts + vector of size nPrimes
-        busyTimes = [[0] * taskSubperiod for _ in range(number_taskPrimes)]
+        # Create #nPrimes arrays of busy times + vector of size nPrimes
+        busyTimes = [None] * number_taskPrimes
         sectionMinBusyTimes = [0] * number_taskPrimes
         delta_sectionSize = [0] * number_taskPrimes
 
@@ -74,25 +143,15 @@ def heuristicScheduling(listTasks, verbose = False):
             sectionIndex = primeSections.index(taskPrimes[primeOption])
             # print(f'Evaluating partition {partitionIndex} (p = {taskPrimes[primeOption]})...')
 
-            # For every already assigned task in the partition:
-            for task_i in assignedTasks[sectionIndex]:
-                # Get busy time
-                Ci = list_execTimes[task_i]
-                Oai = offsets[task_i][2]
-                tBusy = Ci + Oai
-                # Compare to values in indexes congruent to Ohi in mod GCD(Tsi, Ts)
-                Tsi = subperiods[task_i]
-                gcdBetweenTasks = gcd(Tsi, taskSubperiod)
-                osiModGCD = offsets[task_i][0] % gcdBetweenTasks
-                # print(f'Interference with task {task_i}: ({Ci}, {Tsi}). Oh = {offsets[task_i][0]}, congruent to {osiModGCD} (mod {gcdBetweenTasks})')
-
-                while osiModGCD < taskSubperiod:
-                    if busyTimes[primeOption][osiModGCD] < tBusy: busyTimes[primeOption][osiModGCD] = tBusy
-                    osiModGCD += gcdBetweenTasks
-                # print(f'New interference vector for option {primeOption}: {busyTimes[primeOption]}')
+            # Busy times of the already assigned tasks in the partition (only rebuilt when the subperiod changes, as
+            # tasks come by increasing subperiod)
+            if sectionBusyCache[sectionIndex] == None or sectionBusyCache[sectionIndex][0] != taskSubperiod:
+                sectionBusyCache[sectionIndex] = (taskSubperiod, sectionBusyTimes(sectionBusyClasses[sectionIndex], taskSubperiod))
+            busyTimes[primeOption] = sectionBusyCache[sectionIndex][1]
+            # print(f'Interference vector for option {primeOption}: {busyTimes[primeOption]}')
 
             # Get respective smallest values
-            sectionMinBusyTimes[primeOption] = min(busyTimes[primeOption])
+            sectionMinBusyTimes[primeOption] = int(busyTimes[primeOption].min())
 
             # Calculate possible delta in partition length
             tBusyThisSection = sectionMinBusyTimes[primeOption] + taskExecutionTime
@@ -115,8 +174,7 @@ def heuristicScheduling(listTasks, verbose = False):
 
             # Assign Subperiod Offset (Oh * GCD) and Additional Offset (Oa)
             Oa = sectionMinBusyTimes[chosenIndex]
-            new_var = busyTimes[chosenIndex]
-            Oh = new_var.index(Oa)
+            Oh = int(busyTimes[chosenIndex].argmin())
 
         offsets[taskIndex] = [0] * 4
         offsets[taskIndex][0] = Oh
@@ -127,6 +185,19 @@ def heuristicScheduling(listTasks, verbose = False):
         sectionSizes[chosenSection] = max(sectionSizes[chosenSection], tBusyFinal)
         assignedTasks[chosenSection].append(taskIndex)
 
+        # Add the busy time to the section, by residue class and in its busy times for the last subperiod (over a
+        # longer period if GCD(Ts, cached Ts) does not divide the current one)
+        busyByOffset = sectionBusyClasses[chosenSection].setdefault(taskSubperiod, {})
+        busyByOffset[Oh] = max(busyByOffset.get(Oh, 0), tBusyFinal)
+        if sectionBusyCache[chosenSection] != None:
+            cachedSubperiod, cachedBusyTimes = sectionBusyCache[chosenSection]
+            gcdBetweenTasks = gcd(taskSubperiod, cachedSubperiod)
+            busyPeriod = lcm(len(cachedBusyTimes), gcdBetweenTasks)
+            if busyPeriod > len(cachedBusyTimes): cachedBusyTimes = np.tile(cachedBusyTimes, busyPeriod // len(cachedBusyTimes))
+            congruentBusyTimes = cachedBusyTimes[Oh % gcdBetweenTasks::gcdBetweenTasks]
+            np.maximum(congruentBusyTimes, tBusyFinal, out=congruentBusyTimes)
+            sectionBusyCache[chosenSection] = (cachedSubperiod, cachedBusyTimes)
+
         # print(f'Assigned to partition {chosenPartition} (p = {chosenPrime}) with Oh = {Oh}, Oa = {Oa}. Added {desiredDeltaSize} to partition size.\n')
 
     # Assign Transaction Group offsets (Og)
@@ -161,7 +232,7 @@ def heuristicScheduling(listTasks, verbose = False):
     
 def heuristicScheduling2(taskSet, verbose = False):
 
-    taskSet = [task for task in taskSet]
+    taskSet = [dict(task) for task in taskSet]
 
     n = len(taskSet)
     overallGCD = reduce(gcd, [ int(task['period']) for task in taskSet ])
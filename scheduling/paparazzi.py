@@ -5,12 +5,15 @@
 # 
 # Developped by ENAC
 
+from basicFunctions.taskSet import taskPeriods
+
+
 def paparazziScheduling(listTasks, verbose = False):
 
     n = len(listTasks)
     offsets = [0] * n
 
-    list_periods = tuple( [ int(task['period']) for task in listTasks ] )
+    list_periods = tuple( taskPeriods(listTasks) )
 
     k = 0
     for i in range(n):
@@ -0,0 +1,100 @@
+#
+# OFFSET ASSIGNMENT ANALYSIS -- PARAMETER SWEEP
+#
+# Run the analysis of offsetAssignmentAnalysis.py over a grid of (numberTasks, U_target, filterSets, algorithms) in one
+# process: the solver modules, the factor matrix, the simulation cache and the process pool are shared by all points
+#
+# LIAS (ISAE-ENSMA)
+
+
+# -----------------------------------------------------------
+# Input variables (a JSON config file, then the command line, can replace them)
+
+sweepNumberSets = 100                   # Number of sets to generate at each point of the grid
+sweepNumberTasks = [8, 16]              # Values of numberTasks
+sweepU_target = [0.7, 0.95]             # Values of U_target
+sweepFilterSets = [True]                # Values of filterSets
+sweepAlgorithms = [ ['heur_new', 'heur_goossensCoupled', 'heur_can', 'heur_paparazzi'] ]   # Sets of algorithms, by the names of their flags in offsetAssignmentAnalysis.py
+sweepFolderRoot = 'sweep'               # Root for the name of the folder containing the results of every point
+
+# The other parameters (factor matrix, simulation, workers, streaming...) are the flags of offsetAssignmentAnalysis.py
+
+
+# -----------------------------------------------------------
+# Import
+
+from pathlib import Path
+from datetime import datetime
+from itertools import product
+import argparse
+import csv
+import json
+
+import offsetAssignmentAnalysis as analysis
+from basicFunctions.simulationCache import SimulationCache
+from basicFunctions.parallel import createPool
+
+
+# -----------------------------------------------------------
+# ------------------------ ALGORITHM ------------------------
+# -----------------------------------------------------------
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description = 'Compare offset assignment algorithms over a grid of task set parameters')
+    parser.add_argument('--config', metavar = 'file', help = 'JSON file with any of the keys numberSets, numberTasks, U_target, filterSets (lists of values) and algorithms (list of lists of flags)')
+    parser.add_argument('--sets', type = int, help = 'number of sets at each point')
+    parser.add_argument('--tasks', type = int, nargs = '+', help = 'values of numberTasks')
+    parser.add_argument('--utilizations', type = float, nargs = '+', help = 'values of U_target')
+    parser.add_argument('--filter', choices = ['true', 'false'], nargs = '+', help = 'values of filterSets')
+    parser.add_argument('--algorithms', nargs = '+', metavar = 'flag', help = 'one set of algorithms, by their flags (heur_new, heur_can, ...)')
+    arguments = parser.parse_args()
+
+    if arguments.config != None:
+        with open(arguments.config) as file: config = json.load(file)
+        sweepNumberSets = config.get('numberSets', sweepNumberSets)
+        sweepNumberTasks = config.get('numberTasks', sweepNumberTasks)
+        sweepU_target = config.get('U_target', sweepU_target)
+        sweepFilterSets = config.get('filterSets', sweepFilterSets)
+        sweepAlgorithms = config.get('algorithms', sweepAlgorithms)
+    if arguments.sets != None: sweepNumberSets = arguments.sets
+    if arguments.tasks != None: sweepNumberTasks = arguments.tasks
+    if arguments.utilizations != None: sweepU_target = arguments.utilizations
+    if arguments.filter != None: sweepFilterSets = [ value == 'true' for value in arguments.filter ]
+    if arguments.algorithms != None: sweepAlgorithms = [ arguments.algorithms ]
+
+    grid = list( product(sweepAlgorithms, sweepFilterSets, sweepNumberTasks, sweepU_target) )
+
+    print('EVALUATION OF FIFO OFFSET ASSIGNMENT ALGORITHMS -- PARAMETER SWEEP')
+    print('------------------------------------------------------------------')
+    print(f'{len(grid)} points of {sweepNumberSets} sets')
+    print()
+
+    sweepFolder = sweepFolderRoot + '_' + datetime.now().strftime("%y%m%d_%H%M")
+    Path(sweepFolder).mkdir(parents=True, exist_ok=False)
+
+    # Shared by every point
+    cache = SimulationCache(folder = analysis.simCacheFolder, maxFolderSize = analysis.simCacheMaxSize * 2**20) if analysis.simCache else None
+    pool = createPool(analysis.numberWorkers)
+
+    with open(sweepFolder + '/results.csv', "w", newline='') as file:
+        writer = None
+        for p, (algorithmFlags, filterSets, numberTasks, U_target) in enumerate(grid):
+            print(f'Point {p+1}/{len(grid)}: {numberTasks} tasks, U = {U_target:.2f}, ' + ('filtered' if filterSets else 'not filtered'))
+
+            list_algorithms = analysis.getAlgorithms({flag: True for flag in algorithmFlags})
+            outputFolder = f'{sweepFolder}/{p:03d}_{numberTasks}t_U{U_target*100:.0f}' + ('_f' if filterSets else '')
+            summary = analysis.runAnalysis(sweepNumberSets, numberTasks, U_target, filterSets, list_algorithms, outputFolder = outputFolder, cache = cache, pool = pool)
+
+            # One line per (point, algorithm) in the consolidated table
+            for row in summary:
+                row = {'point': p, 'algorithms': '+'.join(algorithmFlags), **row}
+                if writer == None:
+                    writer = csv.DictWriter(file, fieldnames = list(row), delimiter=';')
+                    writer.writeheader()
+                writer.writerow(row)
+            file.flush()
+            print()
+
+    if pool != None: pool.close()
+
+    print(f'Done.\nConsolidated results in {sweepFolder}/results.csv')